@@ -6,6 +6,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 from src.routes.gateway import gateway_bp
+from src.services.event_hub import EventHub
+from src.services.metrics import init_metrics
+from src.services.tracing import init_tracing
 import redis
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -26,9 +29,18 @@ except Exception as e:
     print(f"Redis connection failed: {e}")
     app.config['REDIS_CLIENT'] = None
 
+# One Redis subscription per process feeds every Server-Sent Events stream
+app.config['EVENT_HUB'] = EventHub(app.config['REDIS_CLIENT']) if app.config['REDIS_CLIENT'] else None
+
 # Register blueprints
 app.register_blueprint(gateway_bp, url_prefix='/api')
 
+# Request latency histograms and the Prometheus /metrics endpoint
+init_metrics(app)
+
+# Trace context propagation and span export (TRACING_EXPORTER)
+init_tracing('api-gateway', app)
+
 # Serve frontend
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -64,4 +76,5 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=False)
+    # Threaded: each open event stream holds a thread
+    app.run(host='0.0.0.0', port=8000, debug=False, threaded=True)
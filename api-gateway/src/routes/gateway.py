@@ -1,11 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 import requests
 import json
+import time
+from urllib.parse import urlencode
+from src.services.event_hub import event_stream
+from src.services.metrics import observe_upstream
+from src.services.stream_tickets import get_stream_ticket_ttl, issue_stream_ticket, redeem_stream_ticket
 
 gateway_bp = Blueprint('gateway', __name__)
 
-def forward_request(service_url, endpoint, method='GET', data=None, files=None, headers=None):
+def forward_request(service_url, endpoint, method='GET', data=None, files=None, headers=None, timeout=30):
     """Forward request to microservice."""
+    started = time.perf_counter()
+    status = 'error'
     try:
         url = f"{service_url}{endpoint}"
         
@@ -21,29 +28,34 @@ def forward_request(service_url, endpoint, method='GET', data=None, files=None,
         
         # Make request based on method
         if method == 'GET':
-            response = requests.get(url, headers=request_headers, timeout=30)
+            response = requests.get(url, headers=request_headers, timeout=timeout)
         elif method == 'POST':
             if files:
-                response = requests.post(url, files=files, data=data, headers=request_headers, timeout=30)
+                response = requests.post(url, files=files, data=data, headers=request_headers, timeout=timeout)
             else:
                 if data:
                     request_headers['Content-Type'] = 'application/json'
-                response = requests.post(url, json=data, headers=request_headers, timeout=30)
+                response = requests.post(url, json=data, headers=request_headers, timeout=timeout)
         elif method == 'PUT':
-            response = requests.put(url, json=data, headers=request_headers, timeout=30)
+            response = requests.put(url, json=data, headers=request_headers, timeout=timeout)
         elif method == 'DELETE':
-            response = requests.delete(url, headers=request_headers, timeout=30)
+            response = requests.delete(url, headers=request_headers, timeout=timeout)
         else:
             return {'error': 'Unsupported method'}, 405
         
+        status = response.status_code
         return response.json() if response.content else {}, response.status_code
         
     except requests.exceptions.Timeout:
+        status = 'timeout'
         return {'error': 'Service timeout'}, 504
     except requests.exceptions.ConnectionError:
+        status = 'unavailable'
         return {'error': 'Service unavailable'}, 503
     except Exception as e:
         return {'error': f'Gateway error: {str(e)}'}, 500
+    finally:
+        observe_upstream(service_url, method, status, started)
 
 # Authentication routes
 @gateway_bp.route('/auth/register', methods=['POST'])
@@ -102,10 +114,12 @@ def upload_video():
         if 'video' in request.files:
             files['video'] = request.files['video']
         
+        # Forward form fields such as the encoding profile
         result, status = forward_request(
             current_app.config['VIDEO_PROCESSOR_URL'],
             '/api/video/upload',
             method='POST',
+            data=request.form.to_dict(),
             files=files
         )
         return jsonify(result), status
@@ -113,6 +127,134 @@ def upload_video():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+class _BodyStream:
+    """Incoming request body with a known length, so requests streams it
+    upstream with Content-Length instead of chunked encoding."""
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+def _stream_body(method: str, endpoint: str, content_type: str, forward_headers=('Authorization',)):
+    """Stream the incoming request body as is to video processor service.
+
+    Nothing is parsed or buffered in the gateway, whatever the body size.
+    """
+    try:
+        if request.content_length is None:
+            return jsonify({'error': 'Content-Length is required'}), 411
+        
+        headers = {
+            'Content-Type': content_type,
+            'Content-Length': str(request.content_length)
+        }
+        for name in forward_headers:
+            if request.headers.get(name):
+                headers[name] = request.headers[name]
+        
+        url = f"{current_app.config['VIDEO_PROCESSOR_URL']}{endpoint}"
+        started = time.perf_counter()
+        response = requests.request(
+            method,
+            url,
+            params=request.args.to_dict(),
+            data=_BodyStream(request.stream, request.content_length),
+            headers=headers,
+            timeout=300
+        )
+        observe_upstream(current_app.config['VIDEO_PROCESSOR_URL'], method, response.status_code, started)
+        return jsonify(response.json() if response.content else {}), response.status_code
+        
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Service timeout'}), 504
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Service unavailable'}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@gateway_bp.route('/video/upload/batch', methods=['POST'])
+def upload_batch():
+    """Forward a batch of videos to video processor service."""
+    if request.mimetype == 'multipart/form-data':
+        # Pass the multipart body through untouched (boundary included),
+        # so a folder-sized batch never sits in gateway memory
+        return _stream_body('POST', '/api/video/upload/batch', request.content_type)
+    
+    try:
+        # Only references to chunked uploads: forward as JSON
+        data = request.get_json(silent=True) or request.form.to_dict()
+        if 'upload_ids' in request.form:
+            data['upload_ids'] = request.form.getlist('upload_ids')
+        
+        result, status = forward_request(
+            current_app.config['VIDEO_PROCESSOR_URL'],
+            '/api/video/upload/batch',
+            method='POST',
+            data=data,
+            timeout=300
+        )
+        return jsonify(result), status
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@gateway_bp.route('/video/uploads', methods=['POST'])
+def init_upload():
+    """Forward chunked upload creation to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        '/api/video/uploads',
+        method='POST',
+        data=request.get_json(silent=True) or request.form.to_dict()
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/video/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Stream one upload chunk to video processor service."""
+    return _stream_body(
+        'PUT',
+        f'/api/video/uploads/{upload_id}',
+        'application/octet-stream',
+        forward_headers=('Authorization', 'Content-Range')
+    )
+
+@gateway_bp.route('/video/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Forward upload status request to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/uploads/{upload_id}',
+        method='GET'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/video/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Forward upload completion to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/uploads/{upload_id}/complete',
+        method='POST'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/video/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Forward upload cancellation to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/uploads/{upload_id}',
+        method='DELETE'
+    )
+    return jsonify(result), status
+
 @gateway_bp.route('/video/jobs', methods=['GET'])
 def list_jobs():
     """Forward jobs list request to video processor service."""
@@ -120,8 +262,7 @@ def list_jobs():
     query_params = request.args.to_dict()
     endpoint = '/api/video/jobs'
     if query_params:
-        query_string = '&'.join([f"{k}={v}" for k, v in query_params.items()])
-        endpoint += f"?{query_string}"
+        endpoint += f"?{urlencode(query_params)}"
     
     result, status = forward_request(
         current_app.config['VIDEO_PROCESSOR_URL'],
@@ -140,29 +281,154 @@ def get_job(job_id):
     )
     return jsonify(result), status
 
-@gateway_bp.route('/video/jobs/<int:job_id>/download', methods=['GET'])
-def download_result(job_id):
-    """Forward download request to video processor service."""
+@gateway_bp.route('/video/jobs/<int:job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Forward job deletion to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/jobs/{job_id}',
+        method='DELETE'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/video/jobs/<int:job_id>/progress', methods=['GET'])
+def get_job_progress(job_id):
+    """Forward job progress request to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/jobs/{job_id}/progress',
+        method='GET'
+    )
+    return jsonify(result), status
+
+def _bearer_token():
+    token = request.headers.get('Authorization', '')
+    return token[7:] if token.startswith('Bearer ') else token
+
+def _verify_bearer_token():
+    """(user, token) for a valid Authorization header, or (None, token)."""
+    token = _bearer_token()
+    if not token:
+        return None, token
+    result, status = forward_request(
+        current_app.config['AUTH_SERVICE_URL'],
+        '/api/auth/verify',
+        method='POST',
+        data={'token': token},
+        timeout=5
+    )
+    return (result.get('user') if status == 200 else None), token
+
+@gateway_bp.route('/video/events/ticket', methods=['POST'])
+def create_stream_ticket():
+    """Exchange the bearer token for a short-lived, single-use ?ticket= for EventSource."""
+    redis_client = current_app.config.get('REDIS_CLIENT')
+    if redis_client is None:
+        return jsonify({'error': 'Event stream unavailable'}), 503
+    
+    user, token = _verify_bearer_token()
+    if not token:
+        return jsonify({'error': 'Token is missing'}), 401
+    if not user:
+        return jsonify({'error': 'Token is invalid or expired'}), 401
+    
+    try:
+        ticket = issue_stream_ticket(redis_client, user, token)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'ticket': ticket, 'expires_in': get_stream_ticket_ttl()}), 201
+
+def _open_event_stream(job_id=None):
+    """Authenticate once (Authorization header or ?ticket=), then stream
+    job events from the Redis fan-out."""
+    hub = current_app.config.get('EVENT_HUB')
+    if hub is None:
+        return jsonify({'error': 'Event stream unavailable'}), 503
+    
+    ticket = request.args.get('ticket')
+    if ticket:
+        try:
+            redeemed = redeem_stream_ticket(current_app.config['REDIS_CLIENT'], ticket)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        if not redeemed:
+            return jsonify({'error': 'Ticket is invalid, expired or already used'}), 401
+        user, token = redeemed
+    else:
+        user, token = _verify_bearer_token()
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+        if not user:
+            return jsonify({'error': 'Token is invalid or expired'}), 401
+    
+    initial = None
+    if job_id is not None:
+        # Current state first; also checks the job belongs to the user
+        initial, status = forward_request(
+            current_app.config['VIDEO_PROCESSOR_URL'],
+            f'/api/video/jobs/{job_id}/progress',
+            method='GET',
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        if status != 200:
+            return jsonify(initial), status
+        initial = dict(initial, user_id=user['id'])
+    
+    return Response(
+        event_stream(hub, user['id'], job_id, initial),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Tell nginx not to buffer the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@gateway_bp.route('/video/jobs/<int:job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events with status and progress of one job, until it finishes."""
+    return _open_event_stream(job_id)
+
+@gateway_bp.route('/video/events', methods=['GET'])
+def stream_user_events():
+    """Server-Sent Events with status and progress of all the user's jobs."""
+    return _open_event_stream()
+
+# Request headers forwarded for resumable and conditional downloads
+DOWNLOAD_REQUEST_HEADERS = ('Authorization', 'Range', 'If-Range', 'If-None-Match', 'If-Modified-Since')
+# Response headers relayed back, including X-Accel-Redirect for the front proxy
+DOWNLOAD_RESPONSE_HEADERS = (
+    'Content-Type', 'Content-Disposition', 'Content-Length', 'Content-Range', 'Accept-Ranges',
+    'ETag', 'Last-Modified', 'Cache-Control', 'X-Accel-Redirect', 'X-Frame-Timestamp'
+)
+
+def forward_file(endpoint):
+    """Stream a binary response from the video processor service."""
     try:
-        url = f"{current_app.config['VIDEO_PROCESSOR_URL']}/api/video/jobs/{job_id}/download"
+        url = f"{current_app.config['VIDEO_PROCESSOR_URL']}{endpoint}"
         
-        # Forward Authorization header
-        headers = {}
-        auth_header = request.headers.get('Authorization')
-        if auth_header:
-            headers['Authorization'] = auth_header
+        # Forward Authorization, Range and conditional headers
+        headers = {
+            name: request.headers[name]
+            for name in DOWNLOAD_REQUEST_HEADERS
+            if request.headers.get(name)
+        }
         
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
+        started = time.perf_counter()
+        response = requests.get(url, headers=headers, params=request.args.to_dict(), stream=True, timeout=30)
+        # Time to the response headers; the body is streamed afterwards
+        observe_upstream(current_app.config['VIDEO_PROCESSOR_URL'], 'GET', response.status_code, started)
         
-        if response.status_code == 200:
-            # Stream the file response
+        if response.status_code in (200, 206, 304, 416):
+            # Stream the file response (empty for 304 and X-Accel-Redirect)
             from flask import Response
             return Response(
-                response.iter_content(chunk_size=8192),
-                content_type=response.headers.get('Content-Type'),
+                response.iter_content(chunk_size=64 * 1024),
+                status=response.status_code,
                 headers={
-                    'Content-Disposition': response.headers.get('Content-Disposition'),
-                    'Content-Length': response.headers.get('Content-Length')
+                    name: response.headers[name]
+                    for name in DOWNLOAD_RESPONSE_HEADERS
+                    if name in response.headers
                 }
             )
         else:
@@ -171,6 +437,31 @@ def download_result(job_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@gateway_bp.route('/video/jobs/<int:job_id>/download', methods=['GET'])
+def download_result(job_id):
+    """Forward download request to video processor service."""
+    return forward_file(f'/api/video/jobs/{job_id}/download')
+
+@gateway_bp.route('/video/jobs/<int:job_id>/frames', methods=['GET'])
+def list_frames(job_id):
+    """Forward frame listing request to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        f'/api/video/jobs/{job_id}/frames',
+        method='GET'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/video/jobs/<int:job_id>/frames/<int:number>', methods=['GET'])
+def get_frame(job_id, number):
+    """Forward single frame request to video processor service."""
+    return forward_file(f'/api/video/jobs/{job_id}/frames/{number}')
+
+@gateway_bp.route('/video/jobs/<int:job_id>/frames/subset', methods=['GET'])
+def download_frame_subset(job_id):
+    """Forward frame subset download to video processor service."""
+    return forward_file(f'/api/video/jobs/{job_id}/frames/subset')
+
 @gateway_bp.route('/video/stats', methods=['GET'])
 def get_stats():
     """Forward stats request to video processor service."""
@@ -181,6 +472,64 @@ def get_stats():
     )
     return jsonify(result), status
 
+# Admin routes
+def _admin_endpoint(path):
+    endpoint = f'/api/admin{path}'
+    query_params = request.args.to_dict()
+    if query_params:
+        endpoint += f"?{urlencode(query_params)}"
+    return endpoint
+
+@gateway_bp.route('/admin/dead-letters', methods=['GET'])
+def list_dead_letter_queues():
+    """Forward dead-letter queue summary to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        _admin_endpoint('/dead-letters'),
+        method='GET'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/admin/dead-letters/<queue_name>', methods=['GET'])
+def inspect_dead_letters(queue_name):
+    """Forward dead-letter inspection to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        _admin_endpoint(f'/dead-letters/{queue_name}'),
+        method='GET'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/admin/dead-letters/<queue_name>/replay', methods=['POST'])
+def replay_dead_letters(queue_name):
+    """Forward dead-letter replay to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        _admin_endpoint(f'/dead-letters/{queue_name}/replay'),
+        method='POST'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/admin/stage-timings', methods=['GET'])
+def stage_timing_percentiles():
+    """Forward stage timing percentiles to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        _admin_endpoint('/stage-timings'),
+        method='GET'
+    )
+    return jsonify(result), status
+
+@gateway_bp.route('/admin/user-stats/<int:user_id>/drift', methods=['GET'])
+def user_stats_drift(user_id):
+    """Forward stats consistency check to video processor service."""
+    result, status = forward_request(
+        current_app.config['VIDEO_PROCESSOR_URL'],
+        _admin_endpoint(f'/user-stats/{user_id}/drift'),
+        method='GET'
+    )
+    return jsonify(result), status
+
 # Health check aggregation
 @gateway_bp.route('/health/all', methods=['GET'])
 def health_check_all():
@@ -0,0 +1,122 @@
+import json
+import os
+import queue
+import threading
+import time
+
+# Published by the video processor for every job status/progress change
+JOB_EVENTS_CHANNEL_PATTERN = 'video_job_events:user:*'
+TERMINAL_STATUSES = ('completed', 'failed')
+RETRY_AFTER_SECONDS = 5
+# Progress events are snapshots, so a slow client only needs the latest ones
+SUBSCRIBER_QUEUE_SIZE = 100
+
+def get_heartbeat_interval() -> float:
+    """Seconds between keep-alive comments on idle event streams."""
+    try:
+        return max(1.0, float(os.getenv('SSE_HEARTBEAT_INTERVAL', '15')))
+    except ValueError:
+        return 15.0
+
+def get_max_stream_seconds() -> float:
+    """Seconds before an event stream is closed; EventSource reconnects by itself."""
+    try:
+        return max(60.0, float(os.getenv('SSE_MAX_STREAM_SECONDS', '3600')))
+    except ValueError:
+        return 3600.0
+
+class EventHub:
+    """Fan job events out from one Redis subscription to many SSE clients.
+
+    Each gateway process keeps a single pub/sub connection, whatever the
+    number of open streams; events are routed to per-client queues by
+    user id.
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id: int) -> queue.Queue:
+        events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(events)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, user_id: int, events: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(events)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def _dispatch(self, message):
+        try:
+            event = json.loads(message['data'])
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get('user_id'), ()))
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # Drop the oldest event rather than block the other streams
+                try:
+                    events.get_nowait()
+                    events.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _run(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(JOB_EVENTS_CHANNEL_PATTERN)
+                print("Event hub subscribed to job events")
+                for message in pubsub.listen():
+                    if message.get('type') == 'pmessage':
+                        self._dispatch(message)
+            except Exception as e:
+                print(f"Event hub error: {e}")
+                time.sleep(RETRY_AFTER_SECONDS)
+
+def format_event(event: dict, name: str = 'progress') -> str:
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+def event_stream(hub: EventHub, user_id: int, job_id: int = None, initial: dict = None):
+    """Yield SSE frames for a user's jobs, or one job when job_id is given.
+
+    A single-job stream ends after the job completes or fails.
+    """
+    events = hub.subscribe(user_id)
+    try:
+        # Tell EventSource how long to wait before reconnecting
+        yield f"retry: {int(RETRY_AFTER_SECONDS * 1000)}\n\n"
+        if initial:
+            yield format_event(initial)
+            if job_id is not None and initial.get('status') in TERMINAL_STATUSES:
+                return
+
+        heartbeat = get_heartbeat_interval()
+        deadline = time.monotonic() + get_max_stream_seconds()
+        while time.monotonic() < deadline:
+            try:
+                event = events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+
+            if job_id is not None and event.get('job_id') != job_id:
+                continue
+            yield format_event(event)
+            if job_id is not None and event.get('status') in TERMINAL_STATUSES:
+                return
+    finally:
+        hub.unsubscribe(user_id, events)
@@ -0,0 +1,45 @@
+import time
+from urllib.parse import urlparse
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status']
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds',
+    'Latency of calls from the gateway to a backend service',
+    ['upstream', 'method', 'status']
+)
+
+def init_metrics(app):
+    """Time every request by route template and serve /metrics.
+
+    For streamed responses (downloads, event streams) the time is measured
+    until the response starts, not until the last byte.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+def observe_upstream(service_url: str, method: str, status, started: float):
+    """Record a backend call; status is the HTTP code or 'timeout'/'unavailable'/'error'."""
+    UPSTREAM_LATENCY.labels(urlparse(service_url).hostname or service_url, method, str(status)).observe(
+        time.perf_counter() - started
+    )
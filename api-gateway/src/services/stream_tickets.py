@@ -0,0 +1,37 @@
+import json
+import os
+import secrets
+
+TICKET_KEY = "sse_ticket:{}"
+
+def get_stream_ticket_ttl() -> int:
+    """Seconds a stream ticket can be redeemed after it is issued."""
+    try:
+        return min(max(int(os.getenv('SSE_TICKET_TTL', '30')), 5), 300)
+    except ValueError:
+        return 30
+
+def issue_stream_ticket(redis_client, user: dict, token: str) -> str:
+    """Single-use ticket standing in for the JWT in an EventSource URL.
+
+    EventSource cannot send headers, and a token in the query string ends
+    up in access logs; a ticket there is worthless once used or expired.
+    """
+    ticket = secrets.token_urlsafe(32)
+    redis_client.setex(
+        TICKET_KEY.format(ticket),
+        get_stream_ticket_ttl(),
+        json.dumps({'user': user, 'token': token})
+    )
+    return ticket
+
+def redeem_stream_ticket(redis_client, ticket: str):
+    """(user, token) of a valid ticket, deleting it; None otherwise."""
+    pipeline = redis_client.pipeline()
+    pipeline.get(TICKET_KEY.format(ticket))
+    pipeline.delete(TICKET_KEY.format(ticket))
+    value, _ = pipeline.execute()
+    if not value:
+        return None
+    data = json.loads(value)
+    return data['user'], data['token']
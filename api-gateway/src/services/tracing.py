@@ -0,0 +1,50 @@
+import os
+from opentelemetry import trace
+
+TRACES_DIR = "/app/traces"
+# Requests not worth a trace: Prometheus scrapes and health checks
+EXCLUDED_URLS = 'metrics,api/health'
+
+def get_tracing_exporter() -> str:
+    """Where spans go: 'otlp' (OTEL_EXPORTER_OTLP_ENDPOINT), 'file' or 'none'."""
+    exporter = os.getenv('TRACING_EXPORTER', 'none').lower()
+    return exporter if exporter in ('otlp', 'file', 'none') else 'none'
+
+def _span_exporter(exporter: str, service_name: str):
+    if exporter == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+
+    # One JSON span per line, for offline analysis
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    path = os.getenv('TRACING_FILE', os.path.join(TRACES_DIR, f"{service_name}.jsonl"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return ConsoleSpanExporter(
+        out=open(path, 'a', buffering=1),
+        formatter=lambda span: span.to_json(indent=None) + '\n'
+    )
+
+def init_tracing(service_name: str, app=None):
+    """Export spans and propagate W3C trace context, unless TRACING_EXPORTER=none.
+
+    Incoming requests continue the caller's trace (traceparent header)
+    and the calls forwarded to the services carry it on.
+    """
+    exporter = get_tracing_exporter()
+    if exporter == 'none':
+        return
+
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter(exporter, service_name)))
+    trace.set_tracer_provider(provider)
+
+    if app is not None:
+        FlaskInstrumentor().instrument_app(app, excluded_urls=EXCLUDED_URLS)
+    RequestsInstrumentor().instrument()
+    print(f"Tracing enabled for {service_name} ({exporter})")
@@ -8,6 +8,8 @@ from flask_cors import CORS
 from src.models.user import db
 from src.routes.auth import auth_bp
 from src.routes.health import health_bp
+from src.services.metrics import init_metrics
+from src.services.tracing import init_tracing
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -24,6 +26,12 @@ db.init_app(app)
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(health_bp, url_prefix='/api')
 
+# Request latency histograms, pool usage and the Prometheus /metrics endpoint
+init_metrics(app, db)
+
+# Trace context propagation and span export (TRACING_EXPORTER)
+init_tracing('auth-service', app, db)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,53 @@
+import time
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status']
+)
+
+# (metric, help, QueuePool method)
+POOL_METRICS = (
+    ('db_pool_size', 'Connections the SQLAlchemy pool keeps open', 'size'),
+    ('db_pool_checked_out', 'Pool connections currently in use', 'checkedout'),
+    ('db_pool_overflow', 'Connections open beyond the pool size', 'overflow')
+)
+
+class DatabasePoolCollector:
+    """Read the SQLAlchemy pool usage at scrape time."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def collect(self):
+        for name, documentation, method in POOL_METRICS:
+            # NullPool and friends do not track usage; report 0 rather than fail
+            value = getattr(self.pool, method)() if hasattr(self.pool, method) else 0
+            yield GaugeMetricFamily(name, documentation, value=float(value))
+
+def init_metrics(app, db):
+    """Time every request by route template, export the database pool
+    usage and serve /metrics."""
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+    with app.app_context():
+        REGISTRY.register(DatabasePoolCollector(db.engine.pool))
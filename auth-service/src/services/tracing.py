@@ -0,0 +1,86 @@
+import os
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+TRACES_DIR = "/app/traces"
+# Requests not worth a trace: Prometheus scrapes and health checks
+EXCLUDED_URLS = 'metrics,api/health'
+
+tracer = trace.get_tracer(__name__)
+
+def get_tracing_exporter() -> str:
+    """Where spans go: 'otlp' (OTEL_EXPORTER_OTLP_ENDPOINT), 'file' or 'none'."""
+    exporter = os.getenv('TRACING_EXPORTER', 'none').lower()
+    return exporter if exporter in ('otlp', 'file', 'none') else 'none'
+
+def _span_exporter(exporter: str, service_name: str):
+    if exporter == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+
+    # One JSON span per line, for offline analysis
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    path = os.getenv('TRACING_FILE', os.path.join(TRACES_DIR, f"{service_name}.jsonl"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return ConsoleSpanExporter(
+        out=open(path, 'a', buffering=1),
+        formatter=lambda span: span.to_json(indent=None) + '\n'
+    )
+
+def _trace_queries(engine):
+    """A span per SQL statement, only inside a traced request or job.
+
+    Statements run outside a request (table creation at startup) have no
+    active span and stay out of the traces.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_span(conn, cursor, statement, parameters, context, executemany):
+        if not trace.get_current_span().get_span_context().is_valid:
+            return
+        context._trace_span = tracer.start_span(
+            statement.split(None, 1)[0].upper() if statement else 'SQL',
+            kind=SpanKind.CLIENT,
+            attributes={'db.system': 'postgresql', 'db.statement': statement[:1000]}
+        )
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, '_trace_span', None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, 'handle_error')
+    def fail_query_span(exception_context):
+        span = getattr(exception_context.execution_context, '_trace_span', None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+def init_tracing(service_name: str, app=None, db=None):
+    """Export spans and propagate W3C trace context, unless TRACING_EXPORTER=none.
+
+    Incoming requests continue the caller's trace (traceparent header)
+    and SQL statements become spans.
+    """
+    exporter = get_tracing_exporter()
+    if exporter == 'none':
+        return
+
+    from opentelemetry.instrumentation.flask import FlaskInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter(exporter, service_name)))
+    trace.set_tracer_provider(provider)
+
+    if app is not None:
+        FlaskInstrumentor().instrument_app(app, excluded_urls=EXCLUDED_URLS)
+    if db is not None:
+        with app.app_context():
+            _trace_queries(db.engine)
+    print(f"Tracing enabled for {service_name} ({exporter})")
@@ -46,6 +46,22 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create video_outputs table (result archives shared by identical uploads)
+CREATE TABLE IF NOT EXISTS video_outputs (
+    id SERIAL PRIMARY KEY,
+    content_digest VARCHAR(64) NOT NULL,
+    profile_key VARCHAR(100) NOT NULL,
+    zip_file_path VARCHAR(500) UNIQUE NOT NULL,
+    frame_count INTEGER DEFAULT 0,
+    size_bytes BIGINT DEFAULT 0,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_outputs_digest_profile ON video_outputs(content_digest, profile_key);
+CREATE INDEX IF NOT EXISTS idx_video_outputs_last_accessed ON video_outputs(last_accessed_at);
+
 -- Create video_jobs table
 CREATE TABLE IF NOT EXISTS video_jobs (
     id SERIAL PRIMARY KEY,
@@ -56,6 +72,35 @@ CREATE TABLE IF NOT EXISTS video_jobs (
     progress INTEGER DEFAULT 0,
     frame_count INTEGER DEFAULT 0,
     zip_file_path VARCHAR(500),
+    output_format VARCHAR(10) DEFAULT 'png' CHECK (output_format IN ('png', 'jpeg', 'webp')),
+    output_quality INTEGER DEFAULT 85,
+    max_width INTEGER,
+    max_height INTEGER,
+    zip_compression VARCHAR(10) DEFAULT 'deflated' CHECK (zip_compression IN ('stored', 'deflated')),
+    extraction_mode VARCHAR(10) DEFAULT 'fps' CHECK (extraction_mode IN ('fps', 'keyframes', 'scene')),
+    scene_threshold REAL,
+    drop_duplicates BOOLEAN DEFAULT FALSE,
+    duplicate_threshold INTEGER,
+    processing_metadata JSON,
+    content_digest VARCHAR(64),
+    output_id INTEGER REFERENCES video_outputs(id),
+    duration_seconds DOUBLE PRECISION,
+    width INTEGER,
+    height INTEGER,
+    video_codec VARCHAR(50),
+    stream_count INTEGER,
+    priority_class VARCHAR(20) DEFAULT 'interactive' CHECK (priority_class IN ('interactive', 'batch')),
+    queue_name VARCHAR(50),
+    dispatched_at TIMESTAMP,
+    scheduling_note VARCHAR(255),
+    expires_at TIMESTAMP,
+    evicted_at TIMESTAMP,
+    eviction_reason VARCHAR(50),
+    lease_owner VARCHAR(100),
+    lease_expires_at TIMESTAMP,
+    attempts INTEGER DEFAULT 0,
+    trace_parent VARCHAR(55),
+    stage_timings JSON,
     error_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -66,6 +111,44 @@ CREATE TABLE IF NOT EXISTS video_jobs (
 CREATE INDEX IF NOT EXISTS idx_video_jobs_user_id ON video_jobs(user_id);
 CREATE INDEX IF NOT EXISTS idx_video_jobs_status ON video_jobs(status);
 CREATE INDEX IF NOT EXISTS idx_video_jobs_created_at ON video_jobs(created_at);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_user_created ON video_jobs(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_content_digest ON video_jobs(content_digest);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_dispatch ON video_jobs(status, dispatched_at);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_expires_at ON video_jobs(expires_at);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_lease ON video_jobs(status, lease_expires_at);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_status_completed ON video_jobs(status, completed_at DESC);
+
+-- Create upload_sessions table (resumable chunked uploads)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    original_filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    total_size BIGINT NOT NULL,
+    received_bytes BIGINT NOT NULL DEFAULT 0,
+    options JSON,
+    status VARCHAR(20) DEFAULT 'uploading' CHECK (status IN ('uploading', 'completed', 'aborted', 'rejected')),
+    job_id INTEGER REFERENCES video_jobs(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_user_id ON upload_sessions(user_id);
+
+-- Create user_job_stats table (per-user counters maintained on job status changes)
+CREATE TABLE IF NOT EXISTS user_job_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_jobs INTEGER NOT NULL DEFAULT 0,
+    pending_jobs INTEGER NOT NULL DEFAULT 0,
+    processing_jobs INTEGER NOT NULL DEFAULT 0,
+    completed_jobs INTEGER NOT NULL DEFAULT 0,
+    failed_jobs INTEGER NOT NULL DEFAULT 0,
+    total_frames BIGINT NOT NULL DEFAULT 0,
+    bytes_produced BIGINT NOT NULL DEFAULT 0,
+    processing_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    timed_jobs INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
 -- Create notifications table
 CREATE TABLE IF NOT EXISTS notifications (
@@ -99,6 +182,9 @@ CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
 CREATE TRIGGER update_video_jobs_updated_at BEFORE UPDATE ON video_jobs
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_upload_sessions_updated_at BEFORE UPDATE ON upload_sessions
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
 -- Insert default admin user (password: admin123)
 INSERT INTO users (username, email, password_hash) 
 VALUES ('admin', 'admin@fiapx.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewdBPj3bp.Gm.F5e')
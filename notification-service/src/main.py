@@ -5,6 +5,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, jsonify
 from flask_cors import CORS
+from src.services.metrics import init_metrics
+from src.services.tracing import init_tracing
 from src.services.queue_consumer import start_notification_consumer
 import threading
 
@@ -14,6 +16,12 @@ CORS(app)  # Enable CORS for all routes
 # Configuration
 app.config['SECRET_KEY'] = 'notification_service_secret_key'
 
+# Request latency histograms and the Prometheus /metrics endpoint
+init_metrics(app)
+
+# Trace context propagation and span export (TRACING_EXPORTER)
+init_tracing('notification-service', app)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
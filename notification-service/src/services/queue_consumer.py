@@ -2,8 +2,15 @@ import pika
 import json
 import os
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from src.services.metrics import NOTIFICATIONS_PROCESSED, SMTP_SEND_LATENCY, observe_consume_lag
+from src.services.retry_policy import PoisonMessageError, declare_retry_queues, settle_failed_delivery
+from src.services.tracing import consumer_span, tracer
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+NOTIFICATION_QUEUE = 'notifications'
 
 def get_rabbitmq_connection():
     """Get RabbitMQ connection."""
@@ -16,6 +23,9 @@ def get_rabbitmq_connection():
         print(f"Error connecting to RabbitMQ: {e}")
         return None
 
+def smtp_configured() -> bool:
+    return bool(os.getenv('SMTP_USER') and os.getenv('SMTP_PASSWORD'))
+
 def send_email(to_email: str, subject: str, message: str) -> bool:
     """Send email notification."""
     try:
@@ -24,7 +34,7 @@ def send_email(to_email: str, subject: str, message: str) -> bool:
         smtp_user = os.getenv('SMTP_USER')
         smtp_password = os.getenv('SMTP_PASSWORD')
         
-        if not smtp_user or not smtp_password:
+        if not smtp_configured():
             print("SMTP credentials not configured")
             return False
         
@@ -37,12 +47,19 @@ def send_email(to_email: str, subject: str, message: str) -> bool:
         msg.attach(MIMEText(message, 'plain'))
         
         # Send email
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        text = msg.as_string()
-        server.sendmail(smtp_user, to_email, text)
-        server.quit()
+        started = time.perf_counter()
+        try:
+            with tracer.start_as_current_span('smtp send', kind=SpanKind.CLIENT, attributes={'smtp.host': smtp_host}):
+                server = smtplib.SMTP(smtp_host, smtp_port)
+                server.starttls()
+                server.login(smtp_user, smtp_password)
+                text = msg.as_string()
+                server.sendmail(smtp_user, to_email, text)
+                server.quit()
+        except Exception:
+            SMTP_SEND_LATENCY.labels('error').observe(time.perf_counter() - started)
+            raise
+        SMTP_SEND_LATENCY.labels('sent').observe(time.perf_counter() - started)
         
         print(f"Email sent successfully to {to_email}")
         return True
@@ -66,43 +83,60 @@ def get_user_email(user_id: int) -> str:
         return None
 
 def process_notification_message(ch, method, properties, body):
-    """Process notification message from queue."""
-    try:
-        notification = json.loads(body)
-        user_id = notification.get('user_id')
-        job_id = notification.get('job_id')
-        message = notification.get('message')
-        notification_type = notification.get('type', 'email')
+    """Process notification message from queue.
+    
+    Failed deliveries are retried with exponential backoff through delay
+    queues, and dead-lettered after MESSAGE_MAX_ATTEMPTS.
+    """
+    observe_consume_lag(NOTIFICATION_QUEUE, properties)
+    # Continues the trace of the job that published the notification
+    with consumer_span(NOTIFICATION_QUEUE, properties) as span:
+        try:
+            try:
+                notification = json.loads(body)
+            except ValueError as e:
+                raise PoisonMessageError(f"Invalid JSON: {e}") from e
+            if not isinstance(notification, dict):
+                raise PoisonMessageError("Invalid notification: not an object")
+            user_id = notification.get('user_id')
+            job_id = notification.get('job_id')
+            message = notification.get('message')
+            notification_type = notification.get('type', 'email')
         
-        if not all([user_id, message]):
-            print("Invalid notification: missing required fields")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
+            if not all([user_id, message]):
+                raise PoisonMessageError("Invalid notification: missing required fields")
         
-        print(f"Processing notification for user {user_id}")
+            print(f"Processing notification for user {user_id}")
         
-        if notification_type == 'email':
-            user_email = get_user_email(user_id)
-            if user_email:
-                subject = "FIAP X - Video Processing Update"
-                success = send_email(user_email, subject, message)
+            if notification_type == 'email':
+                user_email = get_user_email(user_id)
+                if user_email:
+                    subject = "FIAP X - Video Processing Update"
+                    success = send_email(user_email, subject, message)
                 
-                if success:
-                    print(f"Email notification sent to user {user_id}")
+                    if success:
+                        print(f"Email notification sent to user {user_id}")
+                    elif smtp_configured():
+                        # SMTP errors are usually transient; try again later
+                        raise Exception(f"Failed to send email to user {user_id}")
+                    else:
+                        print(f"Failed to send email to user {user_id}")
                 else:
-                    print(f"Failed to send email to user {user_id}")
+                    print(f"Could not get email for user {user_id}")
             else:
-                print(f"Could not get email for user {user_id}")
-        else:
-            print(f"Unsupported notification type: {notification_type}")
+                print(f"Unsupported notification type: {notification_type}")
         
-        # Acknowledge message
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+            # Acknowledge message
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            NOTIFICATIONS_PROCESSED.labels('processed').inc()
         
-    except Exception as e:
-        print(f"Error processing notification: {e}")
-        # Reject message and requeue
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        except Exception as e:
+            print(f"Error processing notification: {e}")
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR))
+            NOTIFICATIONS_PROCESSED.labels('dead_letter' if isinstance(e, PoisonMessageError) else 'failed').inc()
+            # Retry after a backoff delay, or dead-letter it
+            settle_failed_delivery(ch, method, properties, body, NOTIFICATION_QUEUE, e)
 
 def start_notification_consumer():
     """Start consuming messages from notification queue."""
@@ -118,13 +152,16 @@ def start_notification_consumer():
                 continue
             
             channel = connection.channel()
-            channel.queue_declare(queue='notifications', durable=True)
+            channel.queue_declare(queue=NOTIFICATION_QUEUE, durable=True)
+            declare_retry_queues(channel, NOTIFICATION_QUEUE)
+            # Confirm retry and dead-letter publishes before acking the original
+            channel.confirm_delivery()
             
             # Set QoS to process one message at a time
             channel.basic_qos(prefetch_count=1)
             
             channel.basic_consume(
-                queue='notifications',
+                queue=NOTIFICATION_QUEUE,
                 on_message_callback=process_notification_message
             )
             
@@ -0,0 +1,313 @@
+"""Frame extraction benchmarks on synthetic videos.
+
+Runs the worker's pipelines (the same calls process_video_frames makes,
+without the database, queue and lease) on videos generated locally with
+ffmpeg's lavfi sources, and reports throughput, stage timings, peak memory
+and output size. Results are saved as JSON and can be compared against a
+stored baseline.
+
+Run from the video-processor directory (inside the worker image, or
+anywhere with ffmpeg on the PATH):
+
+    python -m benchmarks.extraction --suite quick
+    python -m benchmarks.extraction --suite standard --save-baseline benchmarks/baselines/standard.json
+    python -m benchmarks.extraction --suite standard --baseline benchmarks/baselines/standard.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import ensure_video, ffmpeg_version, video_spec
+from src.services.encoding import parse_encoding_profile
+from src.services.frame_dedup import drop_near_duplicates
+from src.services.frame_extractor import (
+    archive_frame_files, extract_frames, probe_duration, stream_frames_to_zip
+)
+from src.services.media_probe import processing_timeout
+
+# Encoding profiles, as a client would send them on upload
+PROFILES = {
+    'png': {},
+    'jpeg': {'output_format': 'jpeg', 'quality': '85'},
+    'png-720w': {'max_width': '720'},
+    'keyframes': {'extraction_mode': 'keyframes'},
+    'dedup': {'drop_duplicates': 'true'}
+}
+
+def _cases(videos: list, pipelines: tuple = ('stream', 'files'), segments: tuple = (1,),
+           profiles: tuple = ('png',)) -> list:
+    return [
+        {'video': video, 'pipeline': pipeline, 'segments': count, 'profile': profile}
+        for video in videos for pipeline in pipelines for count in segments for profile in profiles
+    ]
+
+SUITES = {
+    'quick': _cases([video_spec('360p', 'h264', 10)]),
+    'standard': (
+        _cases([video_spec(resolution, 'h264', 30) for resolution in ('360p', '720p', '1080p')])
+        + _cases([video_spec('720p', codec, 30) for codec in ('vp9', 'mpeg4')], pipelines=('stream',))
+        + _cases([video_spec('720p', 'h264', 30)], pipelines=('stream',),
+                 profiles=('jpeg', 'png-720w', 'keyframes', 'dedup'))
+        + _cases([video_spec('1080p', 'h264', 120)], segments=(1, 4))
+    ),
+}
+SUITES['full'] = SUITES['standard'] + (
+    _cases([video_spec('1080p', 'hevc', 30)], pipelines=('stream',))
+    + _cases([video_spec('1080p', 'h264', 600)], pipelines=('stream',), segments=(1, 4))
+)
+
+def case_id(case: dict) -> str:
+    return f"{case['video']['name']}/{case['pipeline']}/{case['profile']}/seg{case['segments']}"
+
+def _run_pipeline(case: dict, video: dict, work_dir: str) -> dict:
+    """One end-to-end run, as process_video_frames does it. Returns stage
+    timings, frame count and archive size."""
+    profile = parse_encoding_profile(PROFILES[case['profile']])
+    zip_path = os.path.join(work_dir, 'frames.zip')
+    stages = {}
+
+    started = time.perf_counter()
+    duration = probe_duration(video['path'])
+    stages['probe'] = time.perf_counter() - started
+    timeout = processing_timeout(duration)
+
+    if case['pipeline'] == 'stream':
+        stage_started = time.perf_counter()
+        frame_count, _ = stream_frames_to_zip(
+            video['path'], zip_path, segments=case['segments'], timeout=timeout,
+            profile=profile, duration=duration, spool_dir=work_dir
+        )
+        stages['extract_archive'] = time.perf_counter() - stage_started
+    else:
+        frame_dir = os.path.join(work_dir, 'frames')
+        os.makedirs(frame_dir)
+        stage_started = time.perf_counter()
+        frame_files, timestamps = extract_frames(
+            video['path'], frame_dir, segments=case['segments'], timeout=timeout,
+            profile=profile, duration=duration
+        )
+        stages['extract'] = time.perf_counter() - stage_started
+
+        dropped_timestamps = []
+        if profile['drop_duplicates']:
+            stage_started = time.perf_counter()
+            frame_files, timestamps, dropped_timestamps = drop_near_duplicates(
+                frame_dir, frame_files, timestamps, profile['duplicate_threshold']
+            )
+            stages['dedup'] = time.perf_counter() - stage_started
+
+        stage_started = time.perf_counter()
+        archive_frame_files(
+            frame_dir, frame_files, zip_path, profile, timestamps,
+            dropped_timestamps if profile['drop_duplicates'] else None
+        )
+        stages['archive'] = time.perf_counter() - stage_started
+        frame_count = len(frame_files)
+
+    total = time.perf_counter() - started
+    return {
+        'total': total,
+        'stages': stages,
+        'frames': frame_count,
+        'output_bytes': os.path.getsize(zip_path) if os.path.exists(zip_path) else 0
+    }
+
+def _run_case(case: dict, video: dict, work_root: str, repeat: int, warmup: int, results):
+    """Child process body: the whole case runs in a fresh process so peak
+    RSS (ours and ffmpeg's) belongs to this case alone."""
+    try:
+        runs = []
+        for run in range(warmup + repeat):
+            work_dir = tempfile.mkdtemp(dir=work_root)
+            try:
+                measured = _run_pipeline(case, video, work_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            if run >= warmup:
+                runs.append(measured)
+
+        # ru_maxrss is in KiB on Linux
+        results.put({
+            'runs': runs,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'peak_ffmpeg_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        })
+    except Exception as e:
+        results.put({'error': str(e)})
+
+def measure_case(case: dict, video: dict, work_root: str, repeat: int, warmup: int) -> dict:
+    """Run a case in a child process and summarize its runs (medians)."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    child = context.Process(target=_run_case, args=(case, video, work_root, repeat, warmup, results))
+    child.start()
+    outcome = None
+    while outcome is None:
+        try:
+            outcome = results.get(timeout=1)
+        except queue.Empty:
+            if not child.is_alive():
+                outcome = {'error': f"Benchmark process exited with code {child.exitcode}"}
+    child.join()
+    if 'error' in outcome:
+        raise Exception(outcome['error'])
+
+    runs = outcome['runs']
+    total = statistics.median(run['total'] for run in runs)
+    stages = {
+        stage: statistics.median(run['stages'][stage] for run in runs)
+        for stage in runs[0]['stages']
+    }
+    frames = runs[-1]['frames']
+    return {
+        'video': {key: value for key, value in video.items() if key != 'path'},
+        'pipeline': case['pipeline'],
+        'profile': case['profile'],
+        'segments': case['segments'],
+        'frames': frames,
+        'output_bytes': runs[-1]['output_bytes'],
+        'seconds': {'total': total, 'stages': stages, 'runs': [run['total'] for run in runs]},
+        'frames_per_second': frames / total if total else 0.0,
+        'mb_per_second': video['size_bytes'] / 1e6 / total if total else 0.0,
+        'peak_rss_mb': outcome['peak_rss_mb'],
+        'peak_ffmpeg_rss_mb': outcome['peak_ffmpeg_rss_mb']
+    }
+
+def run_suite(cases: list, work_root: str, repeat: int, warmup: int) -> dict:
+    video_dir = os.path.join(work_root, 'videos')
+    videos = {}
+    results = {}
+    for case in cases:
+        name = case['video']['name']
+        if name not in videos:
+            videos[name] = ensure_video(case['video'], video_dir)
+        print(f"Running {case_id(case)}...")
+        results[case_id(case)] = measure_case(case, videos[name], work_root, repeat, warmup)
+    return results
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': ffmpeg_version()
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float, memory_tolerance: float) -> list:
+    """Regressions of results against a baseline, as readable lines.
+
+    A case regresses when its frames/s drops by more than tolerance, its
+    peak RSS grows by more than memory_tolerance, or it extracts a
+    different number of frames from the same input.
+    """
+    regressions = []
+    for key, current in results['cases'].items():
+        previous = baseline['cases'].get(key)
+        if previous is None:
+            continue
+        if previous['video'].get('sha256') != current['video'].get('sha256'):
+            print(f"  {key}: input video differs from the baseline's, not compared")
+            continue
+        if current['frames'] != previous['frames']:
+            regressions.append(f"{key}: {current['frames']} frames, baseline {previous['frames']}")
+        if current['frames_per_second'] < previous['frames_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {current['frames_per_second']:.1f} frames/s, "
+                f"baseline {previous['frames_per_second']:.1f}"
+            )
+        for metric in ('peak_rss_mb', 'peak_ffmpeg_rss_mb'):
+            if current[metric] > previous[metric] * (1 + memory_tolerance):
+                regressions.append(f"{key}: {metric} {current[metric]:.0f}, baseline {previous[metric]:.0f}")
+    return regressions
+
+def print_report(results: dict):
+    header = f"{'case':<42} {'frames':>6} {'total s':>8} {'frames/s':>9} {'MB/s':>7} {'RSS MB':>7} {'ffmpeg MB':>9} {'out MB':>7}"
+    print(header)
+    print('-' * len(header))
+    for key, case in results['cases'].items():
+        print(
+            f"{key:<42} {case['frames']:>6} {case['seconds']['total']:>8.2f} "
+            f"{case['frames_per_second']:>9.1f} {case['mb_per_second']:>7.2f} "
+            f"{case['peak_rss_mb']:>7.0f} {case['peak_ffmpeg_rss_mb']:>9.0f} {case['output_bytes'] / 1e6:>7.1f}"
+        )
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in case['seconds']['stages'].items())
+        print(f"{'':<42} {stages}")
+
+def _save(results: dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as results_file:
+        json.dump(results, results_file, indent=2, sort_keys=True)
+    print(f"Results saved to {path}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Frame extraction benchmarks on synthetic videos')
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--case', action='append', default=[],
+                        help='only run cases whose id contains this text (repeatable)')
+    parser.add_argument('--list', action='store_true', help='list the suite cases and exit')
+    parser.add_argument('--repeat', type=int, default=3, help='measured runs per case (median is reported)')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured runs per case')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'fiapx-benchmarks'),
+                        help='generated videos are cached here between runs')
+    parser.add_argument('--output', help='where to write the results JSON')
+    parser.add_argument('--save-baseline', help='also write the results as a baseline to this path')
+    parser.add_argument('--baseline', help='compare against this baseline; exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed frames/s drop (fraction)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.20, help='allowed peak RSS growth (fraction)')
+    args = parser.parse_args(argv)
+
+    cases = [case for case in SUITES[args.suite] if all(text in case_id(case) for text in args.case)]
+    if args.list:
+        for case in cases:
+            print(case_id(case))
+        return 0
+    if not cases:
+        print("No case matches")
+        return 2
+    if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+        print("ffmpeg and ffprobe must be on the PATH")
+        return 2
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = {
+        'suite': args.suite,
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'settings': {'repeat': max(1, args.repeat), 'warmup': max(0, args.warmup)},
+        'cases': run_suite(cases, args.work_dir, max(1, args.repeat), max(0, args.warmup))
+    }
+    print_report(results)
+    _save(results, args.output or os.path.join(args.work_dir, f"results-{args.suite}.json"))
+    if args.save_baseline:
+        _save(results, args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('environment', {}).get('cpu_count') != results['environment']['cpu_count']:
+            print("Warning: baseline was recorded on a machine with a different CPU count")
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import subprocess
+
+# Encoder arguments and container per codec. Bit-exact flags and a single
+# encoder thread make the same spec produce the same file on every run.
+CODECS = {
+    'h264': (['-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-threads', '1'], 'mp4'),
+    'hevc': (['-c:v', 'libx265', '-preset', 'medium', '-crf', '28', '-x265-params', 'pools=1:log-level=error'], 'mp4'),
+    'vp9': (['-c:v', 'libvpx-vp9', '-b:v', '0', '-crf', '32', '-deadline', 'good', '-cpu-used', '4', '-threads', '1'], 'webm'),
+    'mpeg4': (['-c:v', 'mpeg4', '-q:v', '5', '-threads', '1'], 'avi')
+}
+
+RESOLUTIONS = {
+    '360p': (640, 360),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080)
+}
+
+def video_spec(resolution: str, codec: str, duration: int, rate: int = 30) -> dict:
+    width, height = RESOLUTIONS[resolution]
+    return {
+        'name': f"{resolution}-{codec}-{duration}s",
+        'width': width,
+        'height': height,
+        'codec': codec,
+        'duration': duration,
+        'rate': rate
+    }
+
+def generate_command(spec: dict, path: str) -> list:
+    """ffmpeg command rendering the spec from lavfi's testsrc2 pattern.
+
+    testsrc2 moves every frame, so no two extracted frames are identical
+    and the decoder does real work; a 2 s GOP keeps seeking realistic.
+    """
+    encoder_args, _ = CODECS[spec['codec']]
+    source = f"testsrc2=size={spec['width']}x{spec['height']}:rate={spec['rate']}:duration={spec['duration']}"
+    return [
+        'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', source,
+        '-pix_fmt', 'yuv420p', '-g', str(spec['rate'] * 2),
+        '-fflags', '+bitexact', '-flags:v', '+bitexact'
+    ] + encoder_args + [path]
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as video_file:
+        for chunk in iter(lambda: video_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ensure_video(spec: dict, video_dir: str) -> dict:
+    """Generate the spec's video unless it is already cached in video_dir.
+
+    Returns the spec with the file's path, size and SHA-256, which results
+    carry so a comparison can tell whether both runs decoded the same input.
+    """
+    _, container = CODECS[spec['codec']]
+    path = os.path.join(video_dir, f"{spec['name']}.{container}")
+    if not os.path.exists(path):
+        os.makedirs(video_dir, exist_ok=True)
+        partial = f"{path}.partial.{container}"
+        print(f"Generating {spec['name']}...")
+        result = subprocess.run(generate_command(spec, partial), capture_output=True, text=True)
+        if result.returncode != 0:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise Exception(f"Could not generate {spec['name']}: {result.stderr.strip()}")
+        os.replace(partial, path)
+
+    return dict(spec, path=path, size_bytes=os.path.getsize(path), sha256=file_sha256(path))
+
+def ffmpeg_version() -> str:
+    try:
+        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=10)
+        return result.stdout.splitlines()[0] if result.stdout else 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unavailable'
@@ -6,9 +6,18 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, jsonify
 from flask_cors import CORS
 from src.models.video_job import db
+from src.models.video_output import VideoOutput
+from src.models.upload_session import UploadSession
+from src.models.user_job_stats import UserJobStats
 from src.routes.video import video_bp
 from src.routes.health import health_bp
+from src.routes.admin import admin_bp
 from src.services.queue_consumer import start_queue_consumer
+from src.services.metrics import init_metrics
+from src.services.tracing import init_tracing
+from src.services.queue_service import setup_queues
+from src.services.scheduler import start_dispatcher
+from src.services.storage_manager import start_storage_manager
 import threading
 
 app = Flask(__name__)
@@ -27,6 +36,13 @@ db.init_app(app)
 # Register blueprints
 app.register_blueprint(video_bp, url_prefix='/api/video')
 app.register_blueprint(health_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+# Request latency histograms, pool usage and the Prometheus /metrics endpoint
+init_metrics(app, db)
+
+# Trace context propagation and span export (TRACING_EXPORTER)
+init_tracing(os.getenv('OTEL_SERVICE_NAME', 'video-processor'), app, db)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -36,17 +52,37 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
-if __name__ == '__main__':
-    # Create storage directories
+def prepare_storage():
+    """Create storage directories."""
     os.makedirs('/app/storage/uploads', exist_ok=True)
     os.makedirs('/app/storage/outputs', exist_ok=True)
     os.makedirs('/app/storage/temp', exist_ok=True)
+
+if __name__ == '__main__':
+    prepare_storage()
     
     with app.app_context():
         db.create_all()
     
-    # Start queue consumer in background thread
-    consumer_thread = threading.Thread(target=start_queue_consumer, daemon=True)
-    consumer_thread.start()
+    # Declare queues so publishing works even before a worker starts
+    setup_queues()
+    
+    # Start queue consumer in background thread, unless a standalone
+    # worker (src/worker.py) consumes the queue
+    if os.getenv('EMBEDDED_CONSUMER', 'true').lower() == 'true':
+        consumer_thread = threading.Thread(target=start_queue_consumer, args=(app,), daemon=True)
+        consumer_thread.start()
+    
+    # Periodic fair-share dispatch (jobs are also dispatched on upload and
+    # whenever a job finishes); concurrent dispatchers serialize in Postgres
+    if os.getenv('FAIR_SHARE_DISPATCHER', 'true').lower() == 'true':
+        dispatcher_thread = threading.Thread(target=start_dispatcher, args=(app,), daemon=True)
+        dispatcher_thread.start()
+    
+    # Retention TTL, watermark eviction and orphan sweeps; concurrent
+    # managers take turns through a Postgres advisory lock
+    if os.getenv('STORAGE_MANAGER', 'true').lower() == 'true':
+        storage_thread = threading.Thread(target=start_storage_manager, args=(app,), daemon=True)
+        storage_thread.start()
     
     app.run(host='0.0.0.0', port=8000, debug=False)
@@ -0,0 +1,33 @@
+from datetime import datetime
+from src.models.video_job import db
+
+class UploadSession(db.Model):
+    """A resumable, chunked upload in progress."""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    original_filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    options = db.Column(db.JSON, default=dict)
+    status = db.Column(db.String(20), default='uploading')  # uploading, completed, aborted, rejected
+    job_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id}: {self.received_bytes}/{self.total_size}>'
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.original_filename,
+            'total_size': self.total_size,
+            'received_bytes': self.received_bytes,
+            'status': self.status,
+            'job_id': self.job_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,35 @@
+from datetime import datetime
+from src.models.video_job import db
+
+class UserJobStats(db.Model):
+    """Per-user job counters, kept in step with every job status change."""
+    __tablename__ = 'user_job_stats'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    total_jobs = db.Column(db.Integer, default=0, nullable=False)
+    pending_jobs = db.Column(db.Integer, default=0, nullable=False)
+    processing_jobs = db.Column(db.Integer, default=0, nullable=False)
+    completed_jobs = db.Column(db.Integer, default=0, nullable=False)
+    failed_jobs = db.Column(db.Integer, default=0, nullable=False)
+    total_frames = db.Column(db.BigInteger, default=0, nullable=False)
+    bytes_produced = db.Column(db.BigInteger, default=0, nullable=False)
+    processing_seconds = db.Column(db.Float, default=0, nullable=False)
+    timed_jobs = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserJobStats {self.user_id}: {self.total_jobs} jobs>'
+
+    def to_dict(self):
+        return {
+            'total_jobs': self.total_jobs,
+            'pending_jobs': self.pending_jobs,
+            'completed_jobs': self.completed_jobs,
+            'processing_jobs': self.processing_jobs,
+            'failed_jobs': self.failed_jobs,
+            'success_rate': round((self.completed_jobs / self.total_jobs * 100) if self.total_jobs > 0 else 0, 2),
+            'total_frames': self.total_frames,
+            'bytes_produced': self.bytes_produced,
+            'average_processing_seconds': round(self.processing_seconds / self.timed_jobs, 2) if self.timed_jobs else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
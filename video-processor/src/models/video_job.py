@@ -21,11 +21,50 @@ class VideoJob(db.Model):
     progress = db.Column(db.Integer, default=0)
     frame_count = db.Column(db.Integer, default=0)
     zip_file_path = db.Column(db.String(500))
+    output_format = db.Column(db.String(10), default='png')
+    output_quality = db.Column(db.Integer, default=85)
+    max_width = db.Column(db.Integer)
+    max_height = db.Column(db.Integer)
+    zip_compression = db.Column(db.String(10), default='deflated')
+    extraction_mode = db.Column(db.String(10), default='fps')
+    scene_threshold = db.Column(db.Float)
+    drop_duplicates = db.Column(db.Boolean, default=False)
+    duplicate_threshold = db.Column(db.Integer)
+    processing_metadata = db.Column(db.JSON)
+    content_digest = db.Column(db.String(64), index=True)
+    output_id = db.Column(db.Integer, db.ForeignKey('video_outputs.id'))
+    duration_seconds = db.Column(db.Float)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    video_codec = db.Column(db.String(50))
+    stream_count = db.Column(db.Integer)
+    priority_class = db.Column(db.String(20), default='interactive')
+    queue_name = db.Column(db.String(50))
+    dispatched_at = db.Column(db.DateTime)
+    scheduling_note = db.Column(db.String(255))
+    expires_at = db.Column(db.DateTime)
+    evicted_at = db.Column(db.DateTime)
+    eviction_reason = db.Column(db.String(50))
+    lease_owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+    # W3C traceparent of the upload, so the worker continues its trace
+    trace_parent = db.Column(db.String(55))
+    # Wall/CPU seconds per processing stage and bytes in/out (StageTimings)
+    stage_timings = db.Column(db.JSON)
     error_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('idx_video_jobs_dispatch', 'status', 'dispatched_at'),
+        db.Index('idx_video_jobs_expires_at', 'expires_at'),
+        db.Index('idx_video_jobs_lease', 'status', 'lease_expires_at'),
+        db.Index('idx_video_jobs_status_completed', 'status', completed_at.desc()),
+        db.Index('idx_video_jobs_user_created', 'user_id', created_at.desc(), id.desc()),
+    )
+
     def __repr__(self):
         return f'<VideoJob {self.id}: {self.original_filename}>'
 
@@ -38,6 +77,40 @@ class VideoJob(db.Model):
             'progress': self.progress,
             'frame_count': self.frame_count,
             'zip_file_path': self.zip_file_path,
+            'encoding_profile': {
+                'output_format': self.output_format,
+                'quality': self.output_quality,
+                'max_width': self.max_width,
+                'max_height': self.max_height,
+                'zip_compression': self.zip_compression,
+                'extraction_mode': self.extraction_mode or 'fps',
+                'scene_threshold': self.scene_threshold,
+                'drop_duplicates': bool(self.drop_duplicates),
+                'duplicate_threshold': self.duplicate_threshold
+            },
+            'processing_metadata': self.processing_metadata,
+            'stage_timings': self.stage_timings,
+            'content_digest': self.content_digest,
+            'media': {
+                'duration_seconds': self.duration_seconds,
+                'width': self.width,
+                'height': self.height,
+                'codec': self.video_codec,
+                'stream_count': self.stream_count
+            },
+            'scheduling': {
+                'priority_class': self.priority_class or 'interactive',
+                'queue_name': self.queue_name,
+                'dispatched_at': self.dispatched_at.isoformat() if self.dispatched_at else None,
+                'note': self.scheduling_note,
+                'attempts': self.attempts or 0,
+                'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None
+            },
+            'storage': {
+                'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+                'evicted_at': self.evicted_at.isoformat() if self.evicted_at else None,
+                'eviction_reason': self.eviction_reason
+            },
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
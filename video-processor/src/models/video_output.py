@@ -0,0 +1,36 @@
+from datetime import datetime
+from src.models.video_job import db
+
+class VideoOutput(db.Model):
+    """A result archive, shared by every job with the same content and profile."""
+    __tablename__ = 'video_outputs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    content_digest = db.Column(db.String(64), nullable=False)
+    profile_key = db.Column(db.String(100), nullable=False)
+    zip_file_path = db.Column(db.String(500), nullable=False, unique=True)
+    frame_count = db.Column(db.Integer, default=0)
+    size_bytes = db.Column(db.BigInteger, default=0)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_video_outputs_digest_profile', 'content_digest', 'profile_key'),
+        db.Index('idx_video_outputs_last_accessed', 'last_accessed_at'),
+    )
+
+    def __repr__(self):
+        return f'<VideoOutput {self.id}: {self.zip_file_path} ({self.ref_count} refs)>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'content_digest': self.content_digest,
+            'profile_key': self.profile_key,
+            'frame_count': self.frame_count,
+            'size_bytes': self.size_bytes,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_accessed_at': self.last_accessed_at.isoformat() if self.last_accessed_at else None
+        }
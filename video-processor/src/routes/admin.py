@@ -0,0 +1,146 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from src.models.video_job import VideoJob, JobStatus
+from src.routes.video import token_required
+from src.services.queue_service import VIDEO_QUEUES, get_rabbitmq_connection
+from src.services.retry_policy import dead_letter_queue_name, peek_dead_letters, replay_dead_letters
+from src.services.job_stats import stats_drift
+from src.services.stage_timings import GROUP_BY_OPTIONS, MAX_SUMMARY_JOBS, summarize_stage_timings
+import os
+
+admin_bp = Blueprint('admin', __name__)
+
+# Work queues whose dead-lettered messages can be inspected and replayed
+DEAD_LETTER_SOURCES = list(VIDEO_QUEUES.values()) + ['notifications']
+MAX_DEAD_LETTERS_PER_REQUEST = 1000
+
+def get_admin_usernames() -> set:
+    """Usernames allowed on the admin endpoints; none means they are disabled."""
+    return {name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
+def admin_required(f):
+    """Decorator to require a valid token from a user listed in ADMIN_USERNAMES."""
+    from functools import wraps
+    @wraps(f)
+    @token_required
+    def decorated(current_user, *args, **kwargs):
+        if current_user.get('username') not in get_admin_usernames():
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+def _parse_limit(default: int) -> int:
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, MAX_DEAD_LETTERS_PER_REQUEST))
+
+@admin_bp.route('/dead-letters', methods=['GET'])
+@admin_required
+def list_dead_letter_queues(current_user):
+    """Message count of every dead-letter queue."""
+    connection = get_rabbitmq_connection()
+    if not connection:
+        return jsonify({'error': 'Message broker unavailable'}), 503
+    try:
+        channel = connection.channel()
+        queues = []
+        for queue_name in DEAD_LETTER_SOURCES:
+            declared = channel.queue_declare(queue=dead_letter_queue_name(queue_name), durable=True)
+            queues.append({
+                'queue': queue_name,
+                'dead_letter_queue': dead_letter_queue_name(queue_name),
+                'messages': declared.method.message_count
+            })
+        return jsonify({'queues': queues}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+@admin_bp.route('/dead-letters/<queue_name>', methods=['GET'])
+@admin_required
+def inspect_dead_letters(current_user, queue_name):
+    """Show the oldest dead-lettered messages of a queue without removing them."""
+    if queue_name not in DEAD_LETTER_SOURCES:
+        return jsonify({'error': 'Unknown queue'}), 404
+    connection = get_rabbitmq_connection()
+    if not connection:
+        return jsonify({'error': 'Message broker unavailable'}), 503
+    try:
+        channel = connection.channel()
+        messages = peek_dead_letters(channel, queue_name, _parse_limit(20))
+        # Closing without acking hands every peeked message back
+        channel.close()
+        return jsonify({'queue': queue_name, 'messages': messages}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+@admin_bp.route('/dead-letters/<queue_name>/replay', methods=['POST'])
+@admin_required
+def replay_dead_letter_queue(current_user, queue_name):
+    """Send up to `limit` dead-lettered messages back to their queue."""
+    if queue_name not in DEAD_LETTER_SOURCES:
+        return jsonify({'error': 'Unknown queue'}), 404
+    connection = get_rabbitmq_connection()
+    if not connection:
+        return jsonify({'error': 'Message broker unavailable'}), 503
+    try:
+        channel = connection.channel()
+        channel.confirm_delivery()
+        replayed = replay_dead_letters(channel, queue_name, _parse_limit(MAX_DEAD_LETTERS_PER_REQUEST))
+        print(f"Admin {current_user.get('username')} replayed {replayed} messages into {queue_name}")
+        return jsonify({'queue': queue_name, 'replayed': replayed}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+@admin_bp.route('/stage-timings', methods=['GET'])
+@admin_required
+def stage_timing_percentiles(current_user):
+    """Percentiles of per-stage wall/CPU time over the most recent completed jobs.
+    
+    ?limit= jobs (default 500), ?days= only jobs completed since then,
+    ?codec= filter, ?group_by=codec|resolution|pipeline.
+    """
+    try:
+        group_by = request.args.get('group_by')
+        if group_by and group_by not in GROUP_BY_OPTIONS:
+            return jsonify({'error': f"group_by must be one of: {', '.join(GROUP_BY_OPTIONS)}"}), 400
+        try:
+            limit = max(1, min(int(request.args.get('limit', 500)), MAX_SUMMARY_JOBS))
+            days = float(request.args['days']) if 'days' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'limit and days must be numbers'}), 400
+        
+        query = VideoJob.query.filter(
+            VideoJob.status == JobStatus.COMPLETED,
+            VideoJob.stage_timings.isnot(None)
+        )
+        if days is not None:
+            query = query.filter(VideoJob.completed_at >= datetime.utcnow() - timedelta(days=days))
+        if request.args.get('codec'):
+            query = query.filter(VideoJob.video_codec == request.args['codec'])
+        jobs = query.order_by(VideoJob.completed_at.desc()).limit(limit).all()
+        
+        return jsonify({
+            'jobs': len(jobs),
+            'group_by': group_by,
+            'groups': summarize_stage_timings(jobs, group_by)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/user-stats/<int:user_id>/drift', methods=['GET'])
+@admin_required
+def user_stats_drift(current_user, user_id):
+    """Compare a user's incremental counters with a rebuild from video_jobs."""
+    try:
+        drift = stats_drift(user_id)
+        return jsonify({'user_id': user_id, 'consistent': not drift, 'drift': drift}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
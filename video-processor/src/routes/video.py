@@ -1,7 +1,24 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, request, jsonify, send_file, current_app
 from src.models.video_job import db, VideoJob, JobStatus
-from src.services.queue_service import publish_video_job
+from src.services.encoding import FRAME_MIMETYPES, parse_encoding_profile
+from src.services.cache_service import get_job_progress
+from src.services.archive_index import (
+    get_archive_index, get_max_frames_per_request, parse_frame_numbers, write_subset_archive
+)
+from src.services.download_service import send_archive
+from src.models.upload_session import UploadSession
+from src.services.job_stats import get_user_stats, record_deletion
+from src.services.job_service import create_video_job, create_video_jobs, job_created_response
+from src.services.media_probe import probe_upload
+from src.services.scheduler import DEFAULT_PRIORITY_CLASS, parse_priority_class
+from src.services.pagination import MAX_PER_PAGE, keyset_page
+from src.services.output_store import release_output, remove_file, save_and_hash, touch_output
+from src.services.upload_service import (
+    append_chunk, finalize_digest, forget_upload, get_max_chunk_bytes, get_recommended_chunk_bytes,
+    parse_content_range, remember_hash_state
+)
 import os
+import tempfile
 import uuid
 from werkzeug.utils import secure_filename
 import requests
@@ -27,6 +44,14 @@ def verify_token(token):
         print(f"Error verifying token: {e}")
         return None
 
+def evicted_response(job):
+    """410 for a job whose archive was removed by the storage manager."""
+    return jsonify({
+        'error': 'Result is no longer available',
+        'reason': job.eviction_reason,
+        'evicted_at': job.evicted_at.isoformat()
+    }), 410
+
 def token_required(f):
     """Decorator to require valid JWT token."""
     from functools import wraps
@@ -61,34 +86,350 @@ def upload_video(current_user):
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file format. Supported: mp4, avi, mov, mkv, wmv, flv, webm'}), 400
         
+        # Output encoding profile (format, quality, scale, ZIP compression)
+        # and scheduling class
+        try:
+            profile = parse_encoding_profile(request.form)
+            priority_class = parse_priority_class(request.form)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Generate unique filename
         filename = secure_filename(file.filename)
         unique_filename = f"{uuid.uuid4()}_{filename}"
         
-        # Save file
+        # Save file, hashing it as it streams in
         upload_folder = current_app.config['UPLOAD_FOLDER']
         file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
+        content_digest = save_and_hash(file.stream, file_path)
+        
+        # Reject files ffmpeg cannot decode before they are queued
+        try:
+            media_info = probe_upload(file_path, content_digest)
+        except ValueError as e:
+            remove_file(file_path)
+            return jsonify({'error': str(e)}), 400
+        
+        video_job = create_video_job(
+            current_user['id'], filename, file_path, content_digest, profile, priority_class, media_info
+        )
+        
+        return jsonify(job_created_response(video_job)), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/upload/batch', methods=['POST'])
+@token_required
+def upload_batch(current_user):
+    """Create jobs for many videos in one request.
+    
+    Accepts files under 'videos' and/or fully received chunked uploads
+    under 'upload_ids' (multipart form, or a JSON body when there are no
+    files). Every job shares the request's encoding profile and priority
+    (batch by default); results are reported per file.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if data is not None:
+            raw_upload_ids = data.get('upload_ids') or []
+            values = {key: value for key, value in data.items() if key != 'upload_ids'}
+        else:
+            raw_upload_ids = request.form.getlist('upload_ids')
+            values = request.form.to_dict()
+        if isinstance(raw_upload_ids, str):
+            raw_upload_ids = [raw_upload_ids]
+        values.setdefault('priority', 'batch')
+        try:
+            profile = parse_encoding_profile(values)
+            priority_class = parse_priority_class(values)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        upload_ids = [
+            upload_id.strip()
+            for raw in raw_upload_ids
+            for upload_id in str(raw).split(',')
+            if upload_id.strip()
+        ]
+        files = request.files.getlist('videos')
+        if not files and not upload_ids:
+            return jsonify({'error': 'No videos or upload_ids provided'}), 400
+        
+        results = []
+        uploads = []
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        
+        for file in files:
+            if not file.filename or not allowed_file(file.filename):
+                results.append({'filename': file.filename, 'error': 'Invalid file format'})
+                continue
+            filename = secure_filename(file.filename)
+            file_path = os.path.join(upload_folder, f"{uuid.uuid4()}_{filename}")
+            content_digest = save_and_hash(file.stream, file_path)
+            try:
+                media_info = probe_upload(file_path, content_digest)
+            except ValueError as e:
+                remove_file(file_path)
+                results.append({'filename': filename, 'error': str(e)})
+                continue
+            uploads.append((filename, file_path, content_digest, media_info))
+            results.append({'filename': filename})
+        
+        sessions = {}
+        if upload_ids:
+            sessions = {
+                upload.id: upload
+                for upload in UploadSession.query.filter(
+                    UploadSession.id.in_(upload_ids),
+                    UploadSession.user_id == current_user['id']
+                ).with_for_update().all()
+            }
+        for upload_id in upload_ids:
+            upload = sessions.get(upload_id)
+            if not upload:
+                results.append({'upload_id': upload_id, 'error': 'Upload not found'})
+            elif upload.status != 'uploading':
+                results.append({'upload_id': upload_id, 'error': f'Upload is {upload.status}'})
+            elif upload.received_bytes != upload.total_size:
+                results.append({'upload_id': upload_id, 'error': 'Upload is incomplete'})
+            else:
+                content_digest = finalize_digest(upload.id, upload.file_path, upload.total_size)
+                try:
+                    media_info = probe_upload(upload.file_path, content_digest)
+                except ValueError as e:
+                    upload.status = 'rejected'
+                    remove_file(upload.file_path)
+                    results.append({'upload_id': upload_id, 'error': str(e)})
+                    continue
+                upload.status = 'completed'
+                uploads.append((upload.original_filename, upload.file_path, content_digest, media_info))
+                results.append({'upload_id': upload_id, 'filename': upload.original_filename})
+        
+        if not uploads:
+            # Keep rejected chunked uploads marked as such
+            db.session.commit()
+            return jsonify({'error': 'No valid videos in batch', 'results': results}), 400
+        
+        # One bulk insert and one dispatch pass for the whole batch
+        video_jobs = create_video_jobs(current_user['id'], uploads, profile, priority_class)
+        
+        accepted = iter(video_jobs)
+        for result in results:
+            if 'error' in result:
+                continue
+            video_job = next(accepted)
+            result.update(job_created_response(video_job))
+            if 'upload_id' in result:
+                sessions[result['upload_id']].job_id = video_job.id
+        db.session.commit()
         
-        # Create video job record
-        video_job = VideoJob(
+        return jsonify({
+            'message': f'{len(video_jobs)} of {len(results)} videos accepted',
+            'results': results
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/uploads', methods=['POST'])
+@token_required
+def init_upload(current_user):
+    """Start a resumable, chunked upload."""
+    try:
+        data = request.get_json(silent=True) or request.form.to_dict()
+        
+        filename = data.get('filename') or ''
+        if not filename:
+            return jsonify({'error': 'filename is required'}), 400
+        
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file format. Supported: mp4, avi, mov, mkv, wmv, flv, webm'}), 400
+        
+        try:
+            total_size = int(data.get('total_size'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'total_size must be an integer'}), 400
+        if total_size <= 0:
+            return jsonify({'error': 'total_size must be positive'}), 400
+        
+        try:
+            profile = parse_encoding_profile(data)
+            priority_class = parse_priority_class(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        upload_id = str(uuid.uuid4())
+        filename = secure_filename(filename)
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{upload_id}_{filename}")
+        open(file_path, 'wb').close()
+        
+        upload = UploadSession(
+            id=upload_id,
             user_id=current_user['id'],
             original_filename=filename,
             file_path=file_path,
-            status=JobStatus.PENDING
+            total_size=total_size,
+            received_bytes=0,
+            options={'profile': profile, 'priority_class': priority_class}
         )
+        db.session.add(upload)
+        db.session.commit()
+        
+        response = upload.to_dict()
+        response['chunk_size'] = get_recommended_chunk_bytes()
+        response['max_chunk_size'] = get_max_chunk_bytes()
+        return jsonify(response), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@token_required
+def upload_chunk(current_user, upload_id):
+    """Append one chunk at a byte offset (Content-Range or ?offset=)."""
+    try:
+        upload = UploadSession.query.filter_by(id=upload_id, user_id=current_user['id'])\
+                                    .with_for_update().first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            db.session.rollback()
+            return jsonify({'error': f'Upload is {upload.status}'}), 409
+        
+        length = request.content_length
+        if length is None:
+            db.session.rollback()
+            return jsonify({'error': 'Content-Length is required'}), 411
+        if length > get_max_chunk_bytes():
+            db.session.rollback()
+            return jsonify({'error': f'Chunk larger than {get_max_chunk_bytes()} bytes'}), 413
+        
+        content_range = request.headers.get('Content-Range')
+        try:
+            if content_range:
+                offset, end, total = parse_content_range(content_range)
+                if total != upload.total_size or end - offset + 1 != length:
+                    raise ValueError("Content-Range does not match the upload")
+            else:
+                offset = int(request.args.get('offset', upload.received_bytes))
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         
-        db.session.add(video_job)
+        # Chunks must be contiguous; a client that lost track asks for status
+        if offset != upload.received_bytes:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Unexpected offset',
+                'received_bytes': upload.received_bytes
+            }), 409
+        if offset + length > upload.total_size:
+            db.session.rollback()
+            return jsonify({'error': 'Chunk exceeds declared total_size'}), 400
+        
+        written, digest = append_chunk(upload.id, upload.file_path, offset, request.stream, length)
+        upload.received_bytes = offset + written
         db.session.commit()
+        remember_hash_state(upload.id, digest, upload.received_bytes)
         
-        # Publish job to queue
-        publish_video_job(video_job.id)
+        return jsonify(upload.to_dict()), 200
         
-        return jsonify({
-            'message': 'Video uploaded successfully and queued for processing',
-            'job_id': video_job.id,
-            'status': video_job.status.value
-        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/uploads/<upload_id>', methods=['GET'])
+@token_required
+def get_upload(current_user, upload_id):
+    """Get upload status, including the offset to resume from."""
+    try:
+        upload = UploadSession.query.filter_by(id=upload_id, user_id=current_user['id']).first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        return jsonify(upload.to_dict()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@token_required
+def complete_upload(current_user, upload_id):
+    """Finish a chunked upload: create the job and queue it."""
+    try:
+        upload = UploadSession.query.filter_by(id=upload_id, user_id=current_user['id'])\
+                                    .with_for_update().first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            db.session.rollback()
+            return jsonify({'error': f'Upload is {upload.status}', 'job_id': upload.job_id}), 409
+        
+        if upload.received_bytes != upload.total_size:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Upload is incomplete',
+                'received_bytes': upload.received_bytes,
+                'total_size': upload.total_size
+            }), 409
+        
+        content_digest = finalize_digest(upload.id, upload.file_path, upload.total_size)
+        
+        # Reject files ffmpeg cannot decode before they are queued
+        try:
+            media_info = probe_upload(upload.file_path, content_digest)
+        except ValueError as e:
+            upload.status = 'rejected'
+            db.session.commit()
+            remove_file(upload.file_path)
+            return jsonify({'error': str(e)}), 400
+        upload.status = 'completed'
+        
+        options = upload.options or {}
+        video_job = create_video_job(
+            current_user['id'],
+            upload.original_filename,
+            upload.file_path,
+            content_digest,
+            options.get('profile') or parse_encoding_profile({}),
+            options.get('priority_class') or DEFAULT_PRIORITY_CLASS,
+            media_info
+        )
+        upload.job_id = video_job.id
+        db.session.commit()
+        
+        return jsonify(job_created_response(video_job)), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+def abort_upload(current_user, upload_id):
+    """Abort a chunked upload and discard the received data."""
+    try:
+        upload = UploadSession.query.filter_by(id=upload_id, user_id=current_user['id'])\
+                                    .with_for_update().first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            db.session.rollback()
+            return jsonify({'error': f'Upload is {upload.status}'}), 409
+        
+        upload.status = 'aborted'
+        db.session.commit()
+        forget_upload(upload.id)
+        remove_file(upload.file_path)
+        
+        return jsonify({'message': 'Upload aborted'}), 200
         
     except Exception as e:
         db.session.rollback()
@@ -97,14 +438,34 @@ def upload_video(current_user):
 @video_bp.route('/jobs', methods=['GET'])
 @token_required
 def list_jobs(current_user):
-    """List user's video processing jobs."""
+    """List user's video processing jobs.
+    
+    Page numbers (?page=) by default; ?cursor= (empty for the first page)
+    switches to keyset pagination, whose cost does not grow with depth.
+    The total is only counted there when include_total=true.
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), MAX_PER_PAGE)
+        query = VideoJob.query.filter_by(user_id=current_user['id'])
         
-        jobs = VideoJob.query.filter_by(user_id=current_user['id'])\
-                            .order_by(VideoJob.created_at.desc())\
-                            .paginate(page=page, per_page=per_page, error_out=False)
+        if 'cursor' in request.args:
+            try:
+                jobs, next_cursor = keyset_page(query, per_page, request.args['cursor'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            result = {
+                'jobs': [job.to_dict() for job in jobs],
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+            if request.args.get('include_total', 'false').lower() == 'true':
+                result['total'] = query.count()
+            return jsonify(result), 200
+        
+        page = request.args.get('page', 1, type=int)
+        jobs = query.order_by(VideoJob.created_at.desc(), VideoJob.id.desc())\
+                    .paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
             'jobs': [job.to_dict() for job in jobs.items],
@@ -130,6 +491,64 @@ def get_job(current_user, job_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@video_bp.route('/jobs/<int:job_id>', methods=['DELETE'])
+@token_required
+def delete_job(current_user, job_id):
+    """Delete a job; its archive is removed once no other job uses it."""
+    try:
+        job = VideoJob.query.filter_by(id=job_id, user_id=current_user['id']).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if job.status == JobStatus.PROCESSING:
+            return jsonify({'error': 'Job is being processed'}), 409
+        
+        upload_path = job.file_path if job.status == JobStatus.PENDING else None
+        db.session.delete(job)
+        db.session.flush()
+        record_deletion(job)
+        orphaned_archive = release_output(job)
+        db.session.commit()
+        
+        remove_file(orphaned_archive)
+        remove_file(upload_path)
+        
+        return jsonify({'message': 'Job deleted'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/jobs/<int:job_id>/progress', methods=['GET'])
+@token_required
+def get_job_progress_status(current_user, job_id):
+    """Get job status and progress, served from Redis when available."""
+    try:
+        cached = get_job_progress(job_id)
+        if cached and cached.get('user_id') == current_user['id']:
+            return jsonify({
+                'job_id': job_id,
+                'status': cached['status'],
+                'progress': cached['progress'],
+                'updated_at': cached.get('updated_at'),
+                'source': 'cache'
+            }), 200
+        
+        job = VideoJob.query.filter_by(id=job_id, user_id=current_user['id']).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status.value if job.status else 'pending',
+            'progress': job.progress,
+            'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+            'source': 'database'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @video_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
 @token_required
 def download_result(current_user, job_id):
@@ -142,13 +561,147 @@ def download_result(current_user, job_id):
         if job.status != JobStatus.COMPLETED:
             return jsonify({'error': 'Job not completed yet'}), 400
         
-        if not job.zip_file_path or not os.path.exists(job.zip_file_path):
+        if job.evicted_at:
+            return evicted_response(job)
+        
+        if not job.zip_file_path:
+            return jsonify({'error': 'Result file not found'}), 404
+        
+        try:
+            response = send_archive(
+                job.zip_file_path,
+                f"frames_{job.original_filename}_{job.id}.zip",
+                current_app.config['OUTPUT_FOLDER']
+            )
+            touch_output(job)
+            return response
+        except FileNotFoundError:
             return jsonify({'error': 'Result file not found'}), 404
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/jobs/<int:job_id>/frames', methods=['GET'])
+@token_required
+def list_frames(current_user, job_id):
+    """List the frames of a completed job with their timestamps."""
+    try:
+        job = VideoJob.query.filter_by(id=job_id, user_id=current_user['id']).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if job.status != JobStatus.COMPLETED:
+            return jsonify({'error': 'Job not completed yet'}), 400
+        
+        if job.evicted_at:
+            return evicted_response(job)
+        
+        try:
+            index = get_archive_index(job.zip_file_path)
+        except FileNotFoundError:
+            return jsonify({'error': 'Result file not found'}), 404
+        # Frame reads count as use for LRU eviction (at most one write per hour)
+        touch_output(job)
+        
+        return jsonify({
+            'job_id': job.id,
+            'frame_count': index.frame_count,
+            'extraction_mode': index.extraction_mode,
+            'frames': index.listing()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/jobs/<int:job_id>/frames/<int:number>', methods=['GET'])
+@token_required
+def get_frame(current_user, job_id, number):
+    """Return a single frame image, read straight from the result archive."""
+    try:
+        job = VideoJob.query.filter_by(id=job_id, user_id=current_user['id']).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if job.status != JobStatus.COMPLETED:
+            return jsonify({'error': 'Job not completed yet'}), 400
+        
+        if job.evicted_at:
+            return evicted_response(job)
+        
+        try:
+            index = get_archive_index(job.zip_file_path)
+        except FileNotFoundError:
+            return jsonify({'error': 'Result file not found'}), 404
+        # Frame reads count as use for LRU eviction (at most one write per hour)
+        touch_output(job)
+        
+        if number not in index.frames:
+            return jsonify({'error': 'Frame not found'}), 404
+        
+        response = Response(
+            index.read_frame(number),
+            mimetype=FRAME_MIMETYPES.get(job.output_format or 'png', 'application/octet-stream')
+        )
+        # Results never change, so the entry CRC is a stable validator
+        response.set_etag(f"{index.frames[number].CRC:08x}-{number}")
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        timestamp = index.timestamps.get(number)
+        if timestamp is not None:
+            response.headers['X-Frame-Timestamp'] = str(timestamp)
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@video_bp.route('/jobs/<int:job_id>/frames/subset', methods=['GET'])
+@token_required
+def download_frame_subset(current_user, job_id):
+    """Download selected frames (?numbers=1,5,10-20 or ?start=&end= in seconds) as a ZIP."""
+    try:
+        job = VideoJob.query.filter_by(id=job_id, user_id=current_user['id']).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if job.status != JobStatus.COMPLETED:
+            return jsonify({'error': 'Job not completed yet'}), 400
+        
+        if job.evicted_at:
+            return evicted_response(job)
+        
+        try:
+            index = get_archive_index(job.zip_file_path)
+        except FileNotFoundError:
+            return jsonify({'error': 'Result file not found'}), 404
+        
+        try:
+            if request.args.get('numbers'):
+                numbers = parse_frame_numbers(request.args['numbers'])
+            elif request.args.get('start') is not None or request.args.get('end') is not None:
+                start = float(request.args.get('start', 0))
+                end = float(request.args.get('end', 'inf'))
+                numbers = index.numbers_between(start, end)
+                if len(numbers) > get_max_frames_per_request():
+                    raise ValueError(f"At most {get_max_frames_per_request()} frames per request")
+            else:
+                raise ValueError("Provide numbers or a start/end time range")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        missing = [number for number in numbers if number not in index.frames]
+        if missing:
+            return jsonify({'error': 'Frame not found', 'missing': missing[:20]}), 404
+        if not numbers:
+            return jsonify({'error': 'No frames in the requested range'}), 404
+        
+        subset = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+        write_subset_archive(index, numbers, subset)
+        subset.seek(0)
+        touch_output(job)
         return send_file(
-            job.zip_file_path,
+            subset,
+            mimetype='application/zip',
             as_attachment=True,
-            download_name=f"frames_{job.original_filename}_{job.id}.zip"
+            download_name=f"frames_{job.id}_subset.zip"
         )
         
     except Exception as e:
@@ -157,20 +710,9 @@ def download_result(current_user, job_id):
 @video_bp.route('/stats', methods=['GET'])
 @token_required
 def get_stats(current_user):
-    """Get user's processing statistics."""
+    """Get user's processing statistics (from the per-user counters)."""
     try:
-        total_jobs = VideoJob.query.filter_by(user_id=current_user['id']).count()
-        completed_jobs = VideoJob.query.filter_by(user_id=current_user['id'], status=JobStatus.COMPLETED).count()
-        processing_jobs = VideoJob.query.filter_by(user_id=current_user['id'], status=JobStatus.PROCESSING).count()
-        failed_jobs = VideoJob.query.filter_by(user_id=current_user['id'], status=JobStatus.FAILED).count()
-        
-        return jsonify({
-            'total_jobs': total_jobs,
-            'completed_jobs': completed_jobs,
-            'processing_jobs': processing_jobs,
-            'failed_jobs': failed_jobs,
-            'success_rate': round((completed_jobs / total_jobs * 100) if total_jobs > 0 else 0, 2)
-        }), 200
+        return jsonify(get_user_stats(current_user['id']).to_dict()), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
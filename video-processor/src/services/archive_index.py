@@ -0,0 +1,172 @@
+import json
+import os
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from src.services.frame_extractor import DEFAULT_FPS, MANIFEST_NAME
+
+FRAME_ENTRY = re.compile(r'^frame_(\d+)\.(\w+)$')
+LOCAL_HEADER = struct.Struct('<4s22xHH')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_index_cache_size() -> int:
+    """Number of archive indexes kept in memory per process."""
+    try:
+        return max(1, int(os.getenv('ARCHIVE_INDEX_CACHE_SIZE', '64')))
+    except ValueError:
+        return 64
+
+def get_max_frames_per_request() -> int:
+    """Largest number of frames returned by one subset request."""
+    try:
+        return max(1, int(os.getenv('FRAME_REQUEST_MAX', '500')))
+    except ValueError:
+        return 500
+
+class ArchiveIndex:
+    """Frame number -> entry location for one result archive.
+
+    Built from the central directory (and frames.json when present), so a
+    frame is read with one seek and one read of its compressed bytes.
+    """
+
+    def __init__(self, zip_path: str, frames: dict, timestamps: dict, extraction_mode: str):
+        self.zip_path = zip_path
+        self.frames = frames
+        self.timestamps = timestamps
+        self.extraction_mode = extraction_mode
+
+    @classmethod
+    def build(cls, zip_path: str):
+        frames = {}
+        manifest = None
+        with zipfile.ZipFile(zip_path) as zipf:
+            for info in zipf.infolist():
+                match = FRAME_ENTRY.match(info.filename)
+                if match:
+                    frames[int(match.group(1))] = info
+                elif info.filename == MANIFEST_NAME:
+                    manifest = json.loads(zipf.read(info))
+
+        if manifest:
+            timestamps = {frame['number']: frame['timestamp'] for frame in manifest['frames']}
+            extraction_mode = manifest.get('extraction_mode', 'fps')
+        else:
+            # Archives from before frames.json were always sampled at DEFAULT_FPS
+            timestamps = {number: (number - 1) / DEFAULT_FPS for number in frames}
+            extraction_mode = 'fps'
+        return cls(zip_path, frames, timestamps, extraction_mode)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frames)
+
+    def listing(self) -> list:
+        return [
+            {
+                'number': number,
+                'name': info.filename,
+                'timestamp': self.timestamps.get(number),
+                'size': info.file_size
+            }
+            for number, info in sorted(self.frames.items())
+        ]
+
+    def numbers_between(self, start: float, end: float) -> list:
+        """Frame numbers whose timestamp falls in [start, end]."""
+        return [
+            number for number in sorted(self.frames)
+            if self.timestamps.get(number) is not None and start <= self.timestamps[number] <= end
+        ]
+
+    def _read_entry(self, archive, info: zipfile.ZipInfo) -> bytes:
+        archive.seek(info.header_offset)
+        signature, name_length, extra_length = LOCAL_HEADER.unpack(archive.read(LOCAL_HEADER.size))
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise Exception(f"Corrupt archive entry {info.filename}")
+        archive.seek(name_length + extra_length, os.SEEK_CUR)
+        data = archive.read(info.compress_size)
+
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+        elif info.compress_type != zipfile.ZIP_STORED:
+            raise Exception(f"Unsupported compression for {info.filename}")
+        if zlib.crc32(data) != info.CRC:
+            raise Exception(f"CRC mismatch for {info.filename}")
+        return data
+
+    def read_frames(self, numbers: list):
+        """Yield (name, data) for each frame number, seeking straight to it."""
+        with open(self.zip_path, 'rb') as archive:
+            for number in numbers:
+                info = self.frames[number]
+                yield info.filename, self._read_entry(archive, info)
+
+    def read_frame(self, number: int) -> bytes:
+        for _, data in self.read_frames([number]):
+            return data
+
+def get_archive_index(zip_path: str) -> ArchiveIndex:
+    """Index of a result archive, cached until the file changes.
+
+    Raises FileNotFoundError when the archive is missing.
+    """
+    stat = os.stat(zip_path)
+    key = (zip_path, stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+            return index
+
+    index = ArchiveIndex.build(zip_path)
+
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > get_index_cache_size():
+            _cache.popitem(last=False)
+    return index
+
+def parse_frame_numbers(raw: str) -> list:
+    """Parse '3,7,10-12' into [3, 7, 10, 11, 12]."""
+    numbers = []
+    limit = get_max_frames_per_request()
+    for part in (raw or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if sep else first
+        except ValueError:
+            raise ValueError("numbers must look like '1,5,10-20'")
+        if last < first:
+            raise ValueError(f"Invalid frame range {part}")
+        if len(numbers) + last - first + 1 > limit:
+            raise ValueError(f"At most {limit} frames per request")
+        numbers.extend(range(first, last + 1))
+    return numbers
+
+def write_subset_archive(index: ArchiveIndex, numbers: list, out):
+    """Write the selected frames and their manifest into a new ZIP.
+
+    Frame images are already compressed, so entries are stored as-is.
+    """
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_STORED) as zipf:
+        frames = []
+        for number, (name, data) in zip(numbers, index.read_frames(numbers)):
+            zipf.writestr(name, data)
+            frames.append({'number': number, 'name': name, 'timestamp': index.timestamps.get(number)})
+        zipf.writestr(MANIFEST_NAME, json.dumps({
+            'extraction_mode': index.extraction_mode,
+            'frame_count': len(frames),
+            'frames': frames
+        }))
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from datetime import datetime
+import redis
+
+_redis_client = None
+_last_failure = 0.0
+RETRY_AFTER_SECONDS = 30
+PROGRESS_TTL_SECONDS = 24 * 3600
+MEDIA_PROBE_TTL_SECONDS = 7 * 24 * 3600
+JOB_EVENTS_CHANNEL_PREFIX = 'video_job_events:user:'
+
+def get_redis_client():
+    """Get a shared Redis client, or None while Redis is unreachable."""
+    global _redis_client, _last_failure
+
+    if _redis_client is not None:
+        return _redis_client
+    if time.monotonic() - _last_failure < RETRY_AFTER_SECONDS:
+        return None
+
+    try:
+        client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+        client.ping()
+        _redis_client = client
+        return client
+    except Exception as e:
+        print(f"Redis connection failed: {e}")
+        _last_failure = time.monotonic()
+        return None
+
+def _progress_key(job_id: int) -> str:
+    return f"video_job:{job_id}:progress"
+
+def job_events_channel(user_id: int) -> str:
+    """Pub/sub channel carrying every status/progress change of a user's jobs."""
+    return f"{JOB_EVENTS_CHANNEL_PREFIX}{user_id}"
+
+def publish_job_progress(job_id: int, user_id: int, status: str, progress: int) -> bool:
+    """Store the latest job status/progress in Redis and push it to subscribers.
+
+    The stored copy serves polling; the pub/sub message feeds the gateway's
+    Server-Sent Events streams.
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+
+    payload = {
+        'job_id': job_id,
+        'user_id': user_id,
+        'status': status,
+        'progress': progress,
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    try:
+        message = json.dumps(payload)
+        pipe = client.pipeline(transaction=False)
+        pipe.set(_progress_key(job_id), message, ex=PROGRESS_TTL_SECONDS)
+        pipe.publish(job_events_channel(user_id), message)
+        pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Error publishing progress for job {job_id}: {e}")
+        return False
+
+def get_job_progress(job_id: int):
+    """Read the cached job status/progress, or None when not cached."""
+    client = get_redis_client()
+    if not client:
+        return None
+
+    try:
+        payload = client.get(_progress_key(job_id))
+        return json.loads(payload) if payload else None
+    except Exception as e:
+        print(f"Error reading progress for job {job_id}: {e}")
+        return None
+
+def _media_probe_key(content_digest: str) -> str:
+    return f"media_probe:{content_digest}"
+
+def get_media_probe(content_digest: str):
+    """Read cached ffprobe results for a file digest, or None."""
+    client = get_redis_client()
+    if not client or not content_digest:
+        return None
+
+    try:
+        payload = client.get(_media_probe_key(content_digest))
+        return json.loads(payload) if payload else None
+    except Exception as e:
+        print(f"Error reading media probe for {content_digest}: {e}")
+        return None
+
+def store_media_probe(content_digest: str, media_info: dict) -> bool:
+    """Cache ffprobe results by file digest; identical files probe once."""
+    client = get_redis_client()
+    if not client or not content_digest:
+        return False
+
+    try:
+        client.set(_media_probe_key(content_digest), json.dumps(media_info), ex=MEDIA_PROBE_TTL_SECONDS)
+        return True
+    except Exception as e:
+        print(f"Error caching media probe for {content_digest}: {e}")
+        return False
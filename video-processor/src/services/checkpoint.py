@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import threading
+
+TEMP_ROOT = "/app/storage/temp"
+CHECKPOINT_NAME = "checkpoint.json"
+
+def checkpoints_enabled() -> bool:
+    """Whether workers keep finished segments so a retried job resumes."""
+    return os.getenv('JOB_CHECKPOINTS', 'true').lower() == 'true'
+
+def job_work_dir(job_id: int) -> str:
+    """Working directory of a job; stable across attempts so retries find it."""
+    return os.path.join(TEMP_ROOT, f"job_{job_id}")
+
+class SegmentCheckpoint:
+    """Finished segments of a job, recorded in its working directory.
+
+    The signature (pipeline, segment plan, profile) must match for a saved
+    checkpoint to be reused; otherwise the directory starts over empty.
+    A segment is only recorded once all its frames are on disk, so a crash
+    leaves at worst one unfinished segment per running ffmpeg to redo.
+    """
+
+    def __init__(self, work_dir: str, signature: dict):
+        self.work_dir = work_dir
+        self._path = os.path.join(work_dir, CHECKPOINT_NAME)
+        self._lock = threading.Lock()
+        # Round-trip through JSON so it compares equal to a loaded one
+        signature = json.loads(json.dumps(signature))
+
+        state = None
+        try:
+            with open(self._path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except (OSError, ValueError):
+            pass
+
+        if state and state.get('signature') == signature:
+            self._segments = state.get('segments', {})
+        else:
+            if os.path.isdir(work_dir):
+                shutil.rmtree(work_dir)
+            self._segments = {}
+        self._signature = signature
+        os.makedirs(work_dir, exist_ok=True)
+        if not self._segments:
+            self._save()
+
+    @property
+    def resumed_segments(self) -> int:
+        return len(self._segments)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.work_dir, name)
+
+    def done(self, segment_index: int):
+        """Saved {'frames': n, 'times': [...]} of a finished segment, or None."""
+        with self._lock:
+            return self._segments.get(str(segment_index))
+
+    def mark_done(self, segment_index: int, frames: int, times: list):
+        with self._lock:
+            self._segments[str(segment_index)] = {'frames': frames, 'times': list(times)}
+            self._save()
+
+    def forget(self, segment_index: int):
+        with self._lock:
+            if self._segments.pop(str(segment_index), None) is not None:
+                self._save()
+
+    def _save(self):
+        # Write and rename, so a crash never leaves a torn checkpoint
+        partial = self._path + '.tmp'
+        with open(partial, 'w') as checkpoint_file:
+            json.dump({'signature': self._signature, 'segments': self._segments}, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(partial, self._path)
+
+    def discard(self):
+        """Remove the working directory once the job no longer needs it."""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -0,0 +1,44 @@
+import os
+from flask import Response, send_file
+
+ARCHIVE_MIMETYPE = 'application/zip'
+
+def get_accel_prefix() -> str:
+    """Internal proxy location that serves the outputs folder, or '' to stream from Python.
+
+    When set (e.g. /protected-outputs/), downloads answer with an
+    X-Accel-Redirect header and the front proxy sends the file itself.
+    """
+    prefix = os.getenv('DOWNLOAD_ACCEL_PREFIX', '').strip()
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    return prefix
+
+def send_archive(file_path: str, download_name: str, output_root: str):
+    """Send a result archive with Range and conditional request support.
+
+    Raises FileNotFoundError when the archive is missing.
+    """
+    prefix = get_accel_prefix()
+    if prefix:
+        relative_path = os.path.relpath(file_path, output_root)
+        if relative_path.startswith('..'):
+            raise FileNotFoundError(file_path)
+        os.stat(file_path)
+
+        # The proxy handles Range, ETag and If-* headers for the file itself
+        response = Response(status=200, mimetype=ARCHIVE_MIMETYPE)
+        response.headers['X-Accel-Redirect'] = prefix + relative_path
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
+
+    # A single stat inside send_file both checks the archive exists and
+    # sizes it; Range, If-Range and If-None-Match are answered from it.
+    return send_file(
+        file_path,
+        mimetype=ARCHIVE_MIMETYPE,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
@@ -0,0 +1,186 @@
+import zipfile
+
+OUTPUT_FORMATS = ('png', 'jpeg', 'webp')
+FRAME_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'webp': 'webp'}
+FRAME_MIMETYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+ZIP_COMPRESSIONS = {'stored': zipfile.ZIP_STORED, 'deflated': zipfile.ZIP_DEFLATED}
+EXTRACTION_MODES = ('fps', 'keyframes', 'scene')
+
+DEFAULT_PROFILE = {
+    'output_format': 'png',
+    'quality': 85,
+    'max_width': None,
+    'max_height': None,
+    'zip_compression': 'deflated',
+    'extraction_mode': 'fps',
+    'scene_threshold': 0.3,
+    'drop_duplicates': False,
+    'duplicate_threshold': 6
+}
+
+def _parse_int(values, name: str, minimum: int, maximum: int = None):
+    raw = values.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        if maximum is None:
+            raise ValueError(f"{name} must be at least {minimum}")
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+def _parse_float(values, name: str, minimum: float, maximum: float):
+    raw = values.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not minimum < value < maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+def _parse_bool(values, name: str):
+    raw = values.get(name)
+    if raw in (None, ''):
+        return None
+    if isinstance(raw, bool):
+        return raw
+    value = str(raw).lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+def parse_encoding_profile(values) -> dict:
+    """Build an encoding profile from request values.
+
+    Raises ValueError with a client-facing message on invalid input.
+    """
+    profile = dict(DEFAULT_PROFILE)
+
+    output_format = (values.get('output_format') or profile['output_format']).lower()
+    if output_format == 'jpg':
+        output_format = 'jpeg'
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}")
+    profile['output_format'] = output_format
+
+    quality = _parse_int(values, 'quality', 1, 100)
+    if quality is not None:
+        profile['quality'] = quality
+
+    profile['max_width'] = _parse_int(values, 'max_width', 16)
+    profile['max_height'] = _parse_int(values, 'max_height', 16)
+
+    zip_compression = values.get('zip_compression')
+    if zip_compression:
+        zip_compression = zip_compression.lower()
+        if zip_compression not in ZIP_COMPRESSIONS:
+            raise ValueError(f"zip_compression must be one of: {', '.join(ZIP_COMPRESSIONS)}")
+        profile['zip_compression'] = zip_compression
+    elif output_format != 'png':
+        # JPEG and WebP data does not shrink any further under deflate
+        profile['zip_compression'] = 'stored'
+
+    extraction_mode = (values.get('extraction_mode') or profile['extraction_mode']).lower()
+    if extraction_mode not in EXTRACTION_MODES:
+        raise ValueError(f"extraction_mode must be one of: {', '.join(EXTRACTION_MODES)}")
+    profile['extraction_mode'] = extraction_mode
+
+    scene_threshold = _parse_float(values, 'scene_threshold', 0, 1)
+    if scene_threshold is not None:
+        profile['scene_threshold'] = scene_threshold
+
+    # Optional near-duplicate frame removal (Hamming distance of 64-bit dHash)
+    drop_duplicates = _parse_bool(values, 'drop_duplicates')
+    if drop_duplicates is not None:
+        profile['drop_duplicates'] = drop_duplicates
+    duplicate_threshold = _parse_int(values, 'duplicate_threshold', 0, 64)
+    if duplicate_threshold is not None:
+        profile['duplicate_threshold'] = duplicate_threshold
+
+    return profile
+
+def profile_from_job(job) -> dict:
+    """Read the encoding profile stored on a VideoJob."""
+    return {
+        'output_format': job.output_format or DEFAULT_PROFILE['output_format'],
+        'quality': job.output_quality or DEFAULT_PROFILE['quality'],
+        'max_width': job.max_width,
+        'max_height': job.max_height,
+        'zip_compression': job.zip_compression or DEFAULT_PROFILE['zip_compression'],
+        'extraction_mode': job.extraction_mode or DEFAULT_PROFILE['extraction_mode'],
+        'scene_threshold': job.scene_threshold or DEFAULT_PROFILE['scene_threshold'],
+        'drop_duplicates': bool(job.drop_duplicates),
+        'duplicate_threshold': (job.duplicate_threshold if job.duplicate_threshold is not None
+                                else DEFAULT_PROFILE['duplicate_threshold'])
+    }
+
+def apply_profile(job, profile: dict):
+    """Store an encoding profile on a VideoJob."""
+    job.output_format = profile['output_format']
+    job.output_quality = profile['quality']
+    job.max_width = profile['max_width']
+    job.max_height = profile['max_height']
+    job.zip_compression = profile['zip_compression']
+    job.extraction_mode = profile['extraction_mode']
+    job.scene_threshold = profile['scene_threshold'] if profile['extraction_mode'] == 'scene' else None
+    job.drop_duplicates = profile['drop_duplicates']
+    job.duplicate_threshold = profile['duplicate_threshold'] if profile['drop_duplicates'] else None
+
+def profile_key(profile: dict) -> str:
+    """Canonical string identifying the output a profile produces."""
+    # PNG is lossless, so quality does not change the output
+    quality = '-' if profile['output_format'] == 'png' else str(profile['quality'])
+    parts = [
+        profile['output_format'],
+        quality,
+        f"{profile.get('max_width') or 0}x{profile.get('max_height') or 0}",
+        profile['zip_compression']
+    ]
+    # Fixed-rate keys keep their original form so existing outputs still match
+    mode = profile.get('extraction_mode', 'fps')
+    if mode == 'scene':
+        parts.append(f"scene={profile['scene_threshold']:g}")
+    elif mode != 'fps':
+        parts.append(mode)
+    if profile.get('drop_duplicates'):
+        parts.append(f"dedup={profile['duplicate_threshold']}")
+    return ':'.join(parts)
+
+def scale_filter(profile: dict):
+    """ffmpeg scale filter that only ever shrinks frames, or None."""
+    max_width = profile.get('max_width')
+    max_height = profile.get('max_height')
+    if max_width and max_height:
+        return (f"scale='min(iw,{max_width})':'min(ih,{max_height})'"
+                f":force_original_aspect_ratio=decrease:force_divisible_by=2")
+    if max_width:
+        return f"scale='min(iw,{max_width})':-2"
+    if max_height:
+        return f"scale=-2:'min(ih,{max_height})'"
+    return None
+
+def codec_args(profile: dict) -> list:
+    """ffmpeg output codec arguments for the profile's image format."""
+    output_format = profile['output_format']
+    quality = profile['quality']
+    if output_format == 'jpeg':
+        # Map quality 1-100 onto mjpeg's qscale 31-2 (lower is better)
+        qscale = round(2 + (100 - quality) * 29 / 99)
+        return ['-c:v', 'mjpeg', '-q:v', str(qscale)]
+    if output_format == 'webp':
+        return ['-c:v', 'libwebp', '-quality', str(quality)]
+    return ['-c:v', 'png']
+
+def frame_extension(profile: dict) -> str:
+    return FRAME_EXTENSIONS[profile['output_format']]
+
+def zip_compression_mode(profile: dict) -> int:
+    return ZIP_COMPRESSIONS[profile['zip_compression']]
@@ -0,0 +1,69 @@
+import io
+import os
+import numpy as np
+from PIL import Image
+
+# dHash: compare each pixel of a (HASH_SIZE+1) x HASH_SIZE grayscale
+# thumbnail with its right neighbour, giving a HASH_SIZE^2 bit hash
+HASH_SIZE = 8
+
+def _thumbnail(data: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(data))
+    # JPEG decodes straight at a reduced scale when asked for a small draft
+    image.draft('L', ((HASH_SIZE + 1) * 4, HASH_SIZE * 4))
+    image = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    return np.asarray(image, dtype=np.int16)
+
+def dhash_batch(thumbnails: list) -> np.ndarray:
+    """Difference hashes of many thumbnails at once, as uint64."""
+    if not thumbnails:
+        return np.zeros(0, dtype=np.uint64)
+    pixels = np.stack(thumbnails)                      # (n, 8, 9)
+    bits = pixels[:, :, 1:] > pixels[:, :, :-1]        # (n, 8, 8)
+    packed = np.packbits(bits.reshape(len(thumbnails), -1), axis=1)  # (n, 8) bytes
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+def dhash(data: bytes) -> int:
+    """Difference hash of one encoded image."""
+    return int(dhash_batch([_thumbnail(data)])[0])
+
+def dhash_files(paths: list) -> list:
+    """Difference hashes of image files, in order."""
+    thumbnails = []
+    for path in paths:
+        with open(path, 'rb') as image_file:
+            thumbnails.append(_thumbnail(image_file.read()))
+    return [int(value) for value in dhash_batch(thumbnails)]
+
+class DuplicateFilter:
+    """Drop frames within threshold bits of the last kept frame."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self._last_kept = None
+
+    def keep(self, frame_hash: int) -> bool:
+        if self._last_kept is not None and (frame_hash ^ self._last_kept).bit_count() <= self.threshold:
+            return False
+        self._last_kept = frame_hash
+        return True
+
+def drop_near_duplicates(frame_dir: str, frame_files: list, timestamps: list, threshold: int) -> tuple:
+    """Split frame files of frame_dir into kept and near-duplicate frames.
+
+    Returns the kept frame files, their timestamps and the timestamps of
+    the dropped frames. Files are left in place (they may belong to a
+    checkpointed segment a retry reuses); renumbering happens when the
+    kept ones are archived.
+    """
+    hashes = dhash_files([os.path.join(frame_dir, frame_file) for frame_file in frame_files])
+    duplicate_filter = DuplicateFilter(threshold)
+
+    kept_files, kept_timestamps, dropped_timestamps = [], [], []
+    for frame_file, timestamp, frame_hash in zip(frame_files, timestamps, hashes):
+        if duplicate_filter.keep(frame_hash):
+            kept_files.append(frame_file)
+            kept_timestamps.append(timestamp)
+        else:
+            dropped_timestamps.append(timestamp)
+    return kept_files, kept_timestamps, dropped_timestamps
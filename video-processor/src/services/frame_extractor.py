@@ -0,0 +1,751 @@
+import json
+import math
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from src.services.encoding import (
+    DEFAULT_PROFILE, codec_args, frame_extension, scale_filter, zip_compression_mode
+)
+from src.services.frame_dedup import DuplicateFilter, dhash
+
+DEFAULT_FPS = 1
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+TEMP_ROOT = "/app/storage/temp"
+MANIFEST_NAME = "frames.json"
+
+# ffmpeg -progress writes key=value blocks; these are the keys it emits.
+# Info-level logging is kept (tagged with its level) only for showinfo,
+# which reports the timestamp of every extracted frame.
+PROGRESS_ARGS = ['-progress', 'pipe:2', '-nostats', '-loglevel', 'level+info']
+SHOWINFO_PTS = re.compile(r'pts_time:\s*(-?[0-9.]+)')
+PROGRESS_KEYS = {
+    'frame', 'fps', 'bitrate', 'total_size', 'out_time_us', 'out_time_ms', 'out_time',
+    'dup_frames', 'drop_frames', 'speed', 'progress'
+}
+
+def get_frame_pipeline() -> str:
+    """Frame pipeline used by this worker: 'stream' (default) or 'files'."""
+    pipeline = os.getenv('FRAME_PIPELINE', 'stream').lower()
+    return pipeline if pipeline in ('stream', 'files') else 'stream'
+
+def get_spool_max_bytes() -> int:
+    """Bytes a segment may buffer in memory while waiting for its turn."""
+    try:
+        return int(os.getenv('STREAM_SPOOL_MAX_BYTES', str(64 * 1024 * 1024)))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+def get_segment_count() -> int:
+    """Number of parallel ffmpeg segments configured for this worker."""
+    try:
+        return max(1, int(os.getenv('FFMPEG_SEGMENTS', '1')))
+    except ValueError:
+        return 1
+
+def get_min_segment_seconds() -> float:
+    """Shortest time span worth handing to its own ffmpeg process."""
+    try:
+        return max(1.0, float(os.getenv('FFMPEG_MIN_SEGMENT_SECONDS', '30')))
+    except ValueError:
+        return 30.0
+
+def frame_name(number: int, profile: dict = DEFAULT_PROFILE) -> str:
+    """Archive entry name of a frame."""
+    return f"frame_{number:04d}.{frame_extension(profile)}"
+
+def probe_duration(video_path: str):
+    """Return the container duration of a video in seconds, or None when
+    the container does not record one (ffprobe reports N/A, e.g.
+    MediaRecorder webm and streamed mkv)."""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        video_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise Exception(f"FFprobe error: {result.stderr}")
+
+    try:
+        duration = float(result.stdout.strip())
+    except ValueError:
+        return None
+    return duration if duration > 0 else None
+
+def plan_segments(duration: float, segments: int, fps: int = DEFAULT_FPS) -> list:
+    """Split a video into time segments aligned to the sampling interval.
+
+    Segment boundaries fall on multiples of 1/fps so every sampled frame
+    belongs to exactly one segment and the numbering stays contiguous.
+    """
+    total_frames = max(1, math.ceil(duration * fps))
+    wanted = min(segments, math.ceil(duration / get_min_segment_seconds()))
+    wanted = max(1, min(wanted, total_frames))
+    frames_per_segment = math.ceil(total_frames / wanted)
+
+    plan = []
+    first_frame = 0
+    while first_frame < total_frames:
+        count = min(frames_per_segment, total_frames - first_frame)
+        plan.append({
+            'index': len(plan),
+            'start': first_frame / fps,
+            'duration': count / fps,
+            'max_frames': count,
+            'last': first_frame + count >= total_frames
+        })
+        first_frame += count
+    return plan
+
+def plan_time_segments(duration: float, segments: int) -> list:
+    """Split a video into equal time segments.
+
+    Used when the frames kept are not on a fixed grid (keyframes, scene
+    changes); input seeking makes each frame fall into exactly one segment.
+    """
+    wanted = max(1, min(segments, math.ceil(duration / get_min_segment_seconds())))
+    span = duration / wanted
+    return [
+        {
+            'index': index,
+            'start': index * span,
+            'duration': span,
+            'last': index == wanted - 1
+        }
+        for index in range(wanted)
+    ]
+
+def _plan(video_path: str, segments: int, fps: int, duration: float = None,
+          profile: dict = DEFAULT_PROFILE) -> list:
+    """Segment plan for a job; a single whole-file segment when not splitting
+    or when the duration is unknown."""
+    if segments > 1:
+        if duration is None:
+            duration = probe_duration(video_path)
+        if duration is None:
+            return [{'index': 0, 'last': True}]
+        if profile.get('extraction_mode', 'fps') == 'fps':
+            plan = plan_segments(duration, segments, fps)
+        else:
+            plan = plan_time_segments(duration, segments)
+        if len(plan) > 1:
+            return plan
+    return [{'index': 0, 'last': True}]
+
+def _frame_filters(segment: dict, fps: int, profile: dict) -> list:
+    """Filters choosing which frames are kept for the profile's extraction mode."""
+    mode = profile.get('extraction_mode', 'fps')
+    if mode == 'keyframes':
+        # Non-key frames are never decoded (-skip_frame nokey)
+        return []
+    if mode == 'scene':
+        select = f"gt(scene,{profile['scene_threshold']})"
+        if segment['index'] == 0:
+            # Always keep the opening frame, so static videos yield one frame
+            select = f"eq(n,0)+{select}"
+        return [f"select='{select}'"]
+    return [f'fps={fps}']
+
+def _ffmpeg_command(video_path: str, segment: dict, output_args: list, fps: int,
+                    profile: dict, decoder_threads: int = 0) -> list:
+    """Build the ffmpeg command line for one segment (or the whole file)."""
+    cmd = ['ffmpeg', '-nostdin'] + PROGRESS_ARGS
+    if decoder_threads:
+        cmd += ['-threads', str(decoder_threads)]
+    if profile.get('extraction_mode', 'fps') == 'keyframes':
+        cmd += ['-skip_frame', 'nokey']
+    if 'start' in segment:
+        cmd += [
+            '-ss', f"{segment['start']:.3f}",
+            '-t', f"{segment['duration']:.3f}"
+        ]
+    cmd += ['-i', video_path]
+
+    filters = _frame_filters(segment, fps, profile) + ['showinfo']
+    scale = scale_filter(profile)
+    if scale:
+        filters.append(scale)
+    cmd += ['-vf', ','.join(filters)]
+
+    if profile.get('extraction_mode', 'fps') != 'fps':
+        # Keep the selected frames as they are instead of padding to a fixed rate
+        cmd += ['-vsync', 'vfr']
+
+    # The last segment runs to the end of the file; earlier fixed-rate ones
+    # are capped so boundary rounding never produces the same frame twice.
+    if segment.get('max_frames') and not segment['last']:
+        cmd += ['-frames:v', str(segment['max_frames'])]
+    return cmd + codec_args(profile) + output_args
+
+def _decoder_threads(plan: list) -> int:
+    # Share the cores between segments instead of letting every decoder
+    # spawn one thread per core.
+    if len(plan) == 1:
+        return 0
+    return max(1, (os.cpu_count() or 1) // len(plan))
+
+def _list_frames(directory: str, extension: str) -> list:
+    """List extracted frame files in numeric order."""
+    suffix = f'.{extension}'
+    frames = [f for f in os.listdir(directory) if f.endswith(suffix)]
+    return sorted(frames, key=lambda name: int(name[len('frame_'):-len(suffix)]))
+
+def _is_progress_line(line: str) -> bool:
+    key, sep, _ = line.partition('=')
+    return bool(sep) and (key in PROGRESS_KEYS or key.startswith('stream_'))
+
+def _frame_time(line: str):
+    """Timestamp reported by showinfo for an output frame, or None."""
+    if 'showinfo' not in line:
+        return None
+    match = SHOWINFO_PTS.search(line)
+    return float(match.group(1)) if match else None
+
+def _run_ffmpeg(cmd: list, timeout: int, on_progress=None, on_stdout=None, on_frame_time=None,
+                cancel: threading.Event = None):
+    """Run ffmpeg, reporting the media time reached through on_progress.
+
+    on_stdout, when given, receives the running process and is expected to
+    consume its stdout. on_frame_time receives the timestamp of every frame
+    showinfo reports. ffmpeg is killed if it runs longer than timeout, or
+    as soon as cancel is set.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE if on_stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    errors = deque(maxlen=50)
+
+    def read_stderr():
+        for raw_line in process.stderr:
+            line = raw_line.decode(errors='replace').strip()
+            if not _is_progress_line(line):
+                frame_time = _frame_time(line)
+                if frame_time is not None:
+                    if on_frame_time:
+                        on_frame_time(frame_time)
+                elif line and '[info]' not in line:
+                    errors.append(line)
+                continue
+            key, _, value = line.partition('=')
+            # out_time_ms is in microseconds as well (long-standing ffmpeg quirk)
+            if key in ('out_time_us', 'out_time_ms') and value.isdigit() and on_progress:
+                on_progress(int(value) / 1000000)
+
+    stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+    stderr_thread.start()
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+
+    if cancel is not None:
+        def watch_cancel():
+            while process.poll() is None:
+                if cancel.wait(0.5):
+                    process.kill()
+                    return
+        threading.Thread(target=watch_cancel, daemon=True).start()
+
+    try:
+        if on_stdout:
+            on_stdout(process)
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_thread.join()
+
+    if returncode != 0:
+        stderr = '\n'.join(errors)
+        if returncode < 0:
+            raise Exception(f"FFmpeg timed out or was killed: {stderr}")
+        raise Exception(f"FFmpeg error: {stderr}")
+
+def _segment_progress(progress, segment_index: int):
+    if not progress:
+        return None
+    return lambda seconds: progress(segment_index, seconds)
+
+def _frame_timestamps(plan: list, times: dict, frames: list) -> list:
+    """Absolute video timestamps of (segment_index, local_index) frames.
+
+    showinfo can see frames that are dropped later (the -frames:v cap), so
+    a frame's timestamp is looked up by its position within its segment.
+    """
+    offsets = {segment['index']: segment.get('start', 0.0) for segment in plan}
+    timestamps = []
+    for segment_index, local_index in frames:
+        segment_times = times[segment_index]
+        if local_index < len(segment_times):
+            timestamps.append(round(offsets[segment_index] + segment_times[local_index], 3))
+        else:
+            timestamps.append(None)
+    return timestamps
+
+def write_frame_manifest(zipf: zipfile.ZipFile, timestamps: list, profile: dict = DEFAULT_PROFILE,
+                         dropped_timestamps: list = None):
+    """Add frames.json, mapping every archived frame to its video timestamp."""
+    manifest = {
+        'extraction_mode': profile.get('extraction_mode', 'fps'),
+        'frame_count': len(timestamps),
+        'frames': [
+            {'number': number, 'name': frame_name(number, profile), 'timestamp': timestamp}
+            for number, timestamp in enumerate(timestamps, start=1)
+        ]
+    }
+    if dropped_timestamps is not None:
+        manifest['dropped_duplicates'] = dropped_timestamps
+    zipf.writestr(MANIFEST_NAME, json.dumps(manifest))
+
+def _wait_all(futures: list, on_tick=None, tick_seconds: float = 0.5):
+    """Wait for all futures, calling on_tick periodically from this thread."""
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=tick_seconds, return_when=FIRST_EXCEPTION)
+        for future in done:
+            future.result()
+        if on_tick:
+            on_tick()
+
+def _restored_progress(progress, segment: dict, duration: float):
+    """Report a segment restored from a checkpoint as fully processed."""
+    if progress:
+        progress(segment['index'], segment.get('duration', duration or 0.0))
+
+def _extract_segment(cmd: list, segment_index: int, segment_dir: str, extension: str, timeout: int,
+                     on_progress, times: list, cancel: threading.Event, checkpoint=None):
+    _run_ffmpeg(cmd, timeout, on_progress, None, times.append, cancel)
+    if checkpoint is not None:
+        checkpoint.mark_done(segment_index, len(_list_frames(segment_dir, extension)), times)
+
+def extract_frames(video_path: str, output_dir: str, fps: int = DEFAULT_FPS,
+                   segments: int = 1, timeout: int = 300, profile: dict = DEFAULT_PROFILE,
+                   duration: float = None, progress=None, on_tick=None, checkpoint=None) -> tuple:
+    """Extract frames into output_dir.
+
+    Returns the frame file names (relative to output_dir) in time order and
+    the video timestamp of each. With more than one segment the video is
+    split by time and every segment is decoded by its own ffmpeg process
+    into its own subdirectory; archive_frame_files numbers the frames
+    contiguously. progress(segment_index, seconds) receives ffmpeg's
+    position and on_tick is called periodically from the calling thread.
+    With a checkpoint (whose directory is output_dir), segments finished by
+    an earlier attempt are reused and only the others are decoded again.
+    """
+    plan = _plan(video_path, segments, fps, duration, profile)
+    extension = frame_extension(profile)
+    pattern = f"frame_%04d.{extension}"
+    decoder_threads = _decoder_threads(plan)
+
+    if len(plan) == 1:
+        segment_dirs = [output_dir]
+    else:
+        segment_dirs = []
+        for segment in plan:
+            segment_dir = os.path.join(output_dir, f"segment_{segment['index']:04d}")
+            os.makedirs(segment_dir, exist_ok=True)
+            segment_dirs.append(segment_dir)
+
+    times = {}
+    pending = []
+    for segment, segment_dir in zip(plan, segment_dirs):
+        saved = checkpoint.done(segment['index']) if checkpoint else None
+        if saved and len(_list_frames(segment_dir, extension)) == saved['frames']:
+            times[segment['index']] = saved['times']
+            _restored_progress(progress, segment, duration)
+            continue
+        if checkpoint:
+            # Frames left by an attempt that stopped mid-segment
+            checkpoint.forget(segment['index'])
+            for frame_file in _list_frames(segment_dir, extension):
+                os.remove(os.path.join(segment_dir, frame_file))
+        times[segment['index']] = []
+        pending.append((segment, segment_dir))
+
+    cancel = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+        futures = [
+            executor.submit(
+                _extract_segment,
+                _ffmpeg_command(video_path, segment, ['-y', os.path.join(segment_dir, pattern)],
+                                fps, profile, decoder_threads),
+                segment['index'],
+                segment_dir,
+                extension,
+                timeout,
+                _segment_progress(progress, segment['index']),
+                times[segment['index']],
+                cancel,
+                checkpoint
+            )
+            for segment, segment_dir in pending
+        ]
+        try:
+            _wait_all(futures, on_tick)
+        except Exception:
+            cancel.set()
+            raise
+
+    # Frames stay in their segment directories; order is segment, then frame
+    frame_files = []
+    frames = []
+    for segment, segment_dir in zip(plan, segment_dirs):
+        prefix = os.path.relpath(segment_dir, output_dir)
+        for local_index, frame_file in enumerate(_list_frames(segment_dir, extension)):
+            frame_files.append(frame_file if prefix == '.' else os.path.join(prefix, frame_file))
+            frames.append((segment['index'], local_index))
+
+    return frame_files, _frame_timestamps(plan, times, frames)
+
+def archive_frame_files(frame_dir: str, frame_files: list, zip_path: str, profile: dict = DEFAULT_PROFILE,
+                        timestamps: list = None, dropped_timestamps: list = None):
+    """Pack frames previously extracted to disk into a ZIP archive.
+
+    Entries are numbered contiguously, even when frames were dropped.
+    """
+    with zipfile.ZipFile(zip_path, 'w', zip_compression_mode(profile)) as zipf:
+        for number, frame_file in enumerate(frame_files, start=1):
+            zipf.write(os.path.join(frame_dir, frame_file), frame_name(number, profile))
+        if timestamps is not None:
+            write_frame_manifest(zipf, timestamps, profile, dropped_timestamps)
+
+def _png_frame_end(buffer: bytearray, state: dict):
+    """Walk PNG chunks until IEND; returns the frame length or None."""
+    pos = state.get('pos', 0)
+    if pos == 0:
+        if len(buffer) < len(PNG_SIGNATURE):
+            return None
+        if buffer[:len(PNG_SIGNATURE)] != PNG_SIGNATURE:
+            raise Exception("Unexpected data in ffmpeg image stream")
+        pos = len(PNG_SIGNATURE)
+
+    while pos + 8 <= len(buffer):
+        length = int.from_bytes(buffer[pos:pos + 4], 'big')
+        chunk_type = bytes(buffer[pos + 4:pos + 8])
+        chunk_end = pos + 12 + length  # header + data + CRC
+        if chunk_end > len(buffer):
+            break
+        pos = chunk_end
+        if chunk_type == b'IEND':
+            return pos
+
+    state['pos'] = pos
+    return None
+
+def _jpeg_frame_end(buffer: bytearray, state: dict):
+    """Walk JPEG marker segments up to the scan, then look for EOI."""
+    pos = state.get('pos', 0)
+    if pos == 0:
+        if len(buffer) < 2:
+            return None
+        if buffer[:2] != b'\xff\xd8':
+            raise Exception("Unexpected data in ffmpeg image stream")
+        pos = 2
+
+    while not state.get('in_scan'):
+        if pos + 4 > len(buffer):
+            state['pos'] = pos
+            return None
+        if buffer[pos] != 0xFF:
+            raise Exception("Corrupt JPEG marker in ffmpeg image stream")
+        marker = buffer[pos + 1]
+        if marker == 0xD9:
+            return pos + 2
+        length = int.from_bytes(buffer[pos + 2:pos + 4], 'big')
+        if pos + 2 + length > len(buffer):
+            state['pos'] = pos
+            return None
+        pos += 2 + length
+        if marker == 0xDA:
+            state['in_scan'] = True
+
+    # Inside entropy-coded data 0xFF is always stuffed, so FFD9 can only be EOI
+    end = buffer.find(b'\xff\xd9', pos)
+    if end < 0:
+        state['pos'] = max(pos, len(buffer) - 1)
+        return None
+    return end + 2
+
+def _webp_frame_end(buffer: bytearray, state: dict):
+    """WebP files are RIFF containers with their size in the header."""
+    if len(buffer) < 12:
+        return None
+    if buffer[:4] != b'RIFF' or buffer[8:12] != b'WEBP':
+        raise Exception("Unexpected data in ffmpeg image stream")
+    size = 8 + int.from_bytes(buffer[4:8], 'little')
+    return size if len(buffer) >= size else None
+
+FRAME_END_FINDERS = {
+    'png': _png_frame_end,
+    'jpeg': _jpeg_frame_end,
+    'webp': _webp_frame_end
+}
+
+def split_image_stream(stream, output_format: str = 'png', read_size: int = 1 << 16):
+    """Yield individual images from a concatenated image2pipe stream.
+
+    All supported formats are self-delimiting, so the stream can be split
+    without any framing from ffmpeg.
+    """
+    find_end = FRAME_END_FINDERS[output_format]
+    read = getattr(stream, 'read1', stream.read)
+    buffer = bytearray()
+    state = {}
+
+    while True:
+        chunk = read(read_size)
+        if chunk:
+            buffer += chunk
+
+        while buffer:
+            end = find_end(buffer, state)
+            if end is None:
+                break
+            yield bytes(buffer[:end])
+            del buffer[:end]
+            state = {}
+
+        if not chunk:
+            if buffer:
+                raise Exception("Truncated frame in ffmpeg image stream")
+            return
+
+def segment_part_name(segment_index: int) -> str:
+    return f"segment_{segment_index:04d}.part"
+
+class OrderedArchiveWriter:
+    """Write frames coming from parallel segments into one ZIP in time order.
+
+    The earliest unfinished segment (the head) writes straight into the
+    archive. Later segments spool their frames until every segment before
+    them has finished, so entries are numbered globally without a merge pass.
+    With a duplicate filter, frames too similar to the last kept one are
+    dropped at that point, in time order.
+
+    With a checkpoint, segments that start behind the head spool to a part
+    file in the job's working directory (instead of a temporary file) and
+    are recorded once finished, even if they become the head meanwhile; a
+    retried job restores them with restore_segment instead of decoding them
+    again. A segment that starts as the head (always the first one, and the
+    only one of a single-segment plan) writes straight into the archive as
+    without a checkpoint, and is not recorded: a retry decodes it again.
+    """
+
+    def __init__(self, zipf: zipfile.ZipFile, profile: dict = DEFAULT_PROFILE, spool_dir: str = TEMP_ROOT,
+                 duplicate_filter=None, checkpoint=None):
+        self._zipf = zipf
+        self._profile = profile
+        self._spool_dir = spool_dir
+        self._duplicate_filter = duplicate_filter
+        self._checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._head = 0
+        self._spools = {}
+        self._finished = set()
+        self._received = {}
+        # Segments that wrote into the archive directly: not checkpointed
+        self._direct = set()
+        self.frame_count = 0
+        self.kept = []
+        self.dropped = []
+        self.cancel = threading.Event()
+
+    @property
+    def filters_duplicates(self) -> bool:
+        return self._duplicate_filter is not None
+
+    @property
+    def aborted(self) -> bool:
+        return self.cancel.is_set()
+
+    def _write_frame(self, frame: tuple, data: bytes, frame_hash: int):
+        if self._duplicate_filter and not self._duplicate_filter.keep(frame_hash):
+            self.dropped.append(frame)
+            return
+        self.frame_count += 1
+        self.kept.append(frame)
+        self._zipf.writestr(frame_name(self.frame_count, self._profile), data)
+
+    def _drain_spool(self, segment_index: int):
+        spool = self._spools.pop(segment_index, None)
+        if spool is None:
+            return
+        spool.seek(0)
+        local_index = 0
+        while True:
+            header = spool.read(12)
+            if not header:
+                break
+            frame_hash = int.from_bytes(header[4:], 'big')
+            data = spool.read(int.from_bytes(header[:4], 'big'))
+            self._write_frame((segment_index, local_index), data, frame_hash)
+            local_index += 1
+        spool.close()
+
+    def _open_spool(self, segment_index: int):
+        if self._checkpoint is not None:
+            return open(self._checkpoint.path(segment_part_name(segment_index)), 'w+b')
+        os.makedirs(self._spool_dir, exist_ok=True)
+        return tempfile.SpooledTemporaryFile(max_size=get_spool_max_bytes(), dir=self._spool_dir)
+
+    def _advance(self):
+        while self._head in self._finished:
+            # A head with a part file spooled everything; otherwise a no-op
+            self._drain_spool(self._head)
+            self._head += 1
+            if self._checkpoint is None:
+                # The new head's early frames, then it writes directly
+                self._drain_spool(self._head)
+
+    def write(self, segment_index: int, data: bytes, frame_hash: int = 0):
+        with self._lock:
+            local_index = self._received.get(segment_index, 0)
+            self._received[segment_index] = local_index + 1
+            # With a checkpoint, a segment keeps its part file complete
+            if segment_index == self._head and (self._checkpoint is None or segment_index not in self._spools):
+                self._direct.add(segment_index)
+                self._write_frame((segment_index, local_index), data, frame_hash)
+                return
+
+            spool = self._spools.get(segment_index)
+            if spool is None:
+                spool = self._open_spool(segment_index)
+                self._spools[segment_index] = spool
+            spool.write(len(data).to_bytes(4, 'big'))
+            spool.write(frame_hash.to_bytes(8, 'big'))
+            spool.write(data)
+
+    def finish_segment(self, segment_index: int, times: list = None):
+        with self._lock:
+            if self._checkpoint is not None and segment_index not in self._direct:
+                spool = self._spools.get(segment_index)
+                if spool is not None:
+                    spool.flush()
+                self._checkpoint.mark_done(segment_index, self._received.get(segment_index, 0), times or [])
+            self._finished.add(segment_index)
+            self._advance()
+
+    def restore_segment(self, segment_index: int, frames: int):
+        """Take a segment finished by an earlier attempt from its part file."""
+        with self._lock:
+            if frames:
+                self._spools[segment_index] = open(self._checkpoint.path(segment_part_name(segment_index)), 'rb')
+            self._received[segment_index] = frames
+            self._finished.add(segment_index)
+            self._advance()
+
+    def abort(self):
+        """Stop the remaining segments (and their ffmpeg) after a sibling failed."""
+        self.cancel.set()
+
+    def close(self):
+        with self._lock:
+            for spool in self._spools.values():
+                spool.close()
+            self._spools.clear()
+
+def _stream_segment(cmd: list, segment_index: int, writer: OrderedArchiveWriter,
+                    output_format: str, timeout: int, on_progress=None, times: list = None) -> int:
+    """Run one ffmpeg process and feed its frames to the archive writer.
+
+    Returns the number of frames the segment produced.
+    """
+    count = 0
+    times = [] if times is None else times
+
+    def consume(process):
+        nonlocal count
+        for frame in split_image_stream(process.stdout, output_format):
+            if writer.aborted:
+                process.kill()
+                break
+            # Hash here, in parallel; the writer compares in time order
+            writer.write(segment_index, frame, dhash(frame) if writer.filters_duplicates else 0)
+            count += 1
+
+    _run_ffmpeg(cmd, timeout, on_progress, consume, times.append, writer.cancel)
+    writer.finish_segment(segment_index, times)
+    return count
+
+def stream_frames_to_zip(video_path: str, zip_path: str, fps: int = DEFAULT_FPS,
+                         segments: int = 1, timeout: int = 300, profile: dict = DEFAULT_PROFILE,
+                         duration: float = None, progress=None, on_tick=None, checkpoint=None,
+                         spool_dir: str = TEMP_ROOT) -> tuple:
+    """Extract frames through an ffmpeg pipe straight into a ZIP archive.
+
+    No frame file is ever written: ffmpeg writes images to stdout with
+    image2pipe, the stream is split into images and each image becomes an
+    archive entry, followed by the frames.json manifest. With a checkpoint,
+    segments behind the head are staged in part files so a retried job only
+    decodes the segments that had not finished. Returns the number of frames written
+    and the timestamps of near-duplicate frames dropped (when the profile
+    asks for it).
+    """
+    plan = _plan(video_path, segments, fps, duration, profile)
+    decoder_threads = _decoder_threads(plan)
+    stream_output = ['-f', 'image2pipe', 'pipe:1']
+
+    times = {}
+    restored = []
+    pending = []
+    for segment in plan:
+        saved = checkpoint.done(segment['index']) if checkpoint else None
+        if saved and (not saved['frames'] or os.path.exists(checkpoint.path(segment_part_name(segment['index'])))):
+            times[segment['index']] = saved['times']
+            restored.append((segment, saved['frames']))
+        else:
+            times[segment['index']] = []
+            pending.append(segment)
+
+    with zipfile.ZipFile(zip_path, 'w', zip_compression_mode(profile)) as zipf:
+        duplicate_filter = None
+        if profile.get('drop_duplicates'):
+            duplicate_filter = DuplicateFilter(profile['duplicate_threshold'])
+        writer = OrderedArchiveWriter(zipf, profile, spool_dir, duplicate_filter=duplicate_filter,
+                                      checkpoint=checkpoint)
+        try:
+            for segment, frames in restored:
+                writer.restore_segment(segment['index'], frames)
+                _restored_progress(progress, segment, duration)
+
+            with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                futures = [
+                    executor.submit(
+                        _stream_segment,
+                        _ffmpeg_command(video_path, segment, stream_output, fps, profile, decoder_threads),
+                        segment['index'],
+                        writer,
+                        profile['output_format'],
+                        timeout,
+                        _segment_progress(progress, segment['index']),
+                        times[segment['index']]
+                    )
+                    for segment in pending
+                ]
+                try:
+                    _wait_all(futures, on_tick)
+                except Exception:
+                    writer.abort()
+                    raise
+        finally:
+            writer.close()
+
+        dropped_timestamps = _frame_timestamps(plan, times, writer.dropped)
+        if writer.frame_count:
+            write_frame_manifest(
+                zipf,
+                _frame_timestamps(plan, times, writer.kept),
+                profile,
+                dropped_timestamps if writer.filters_duplicates else None
+            )
+
+    return writer.frame_count, dropped_timestamps
@@ -0,0 +1,206 @@
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from src.models.video_job import db, VideoJob, JobStatus
+from src.services.cache_service import publish_job_progress
+from src.services.job_stats import record_transition
+from src.services.queue_service import publish_notification
+
+class LeaseLostError(Exception):
+    """Another worker took over the job; this attempt must stop without touching it."""
+
+def get_lease_ttl() -> float:
+    """Seconds a worker's claim on a job lasts without a heartbeat."""
+    try:
+        return max(30.0, float(os.getenv('JOB_LEASE_TTL', '300')))
+    except ValueError:
+        return 300.0
+
+def get_heartbeat_interval() -> float:
+    """Seconds between lease renewals while a job runs."""
+    try:
+        return max(1.0, float(os.getenv('JOB_HEARTBEAT_INTERVAL', '30')))
+    except ValueError:
+        return 30.0
+
+def get_dispatch_ttl() -> float:
+    """Seconds a dispatched job may stay PENDING before it is dispatched again."""
+    try:
+        return max(60.0, float(os.getenv('JOB_DISPATCH_TTL', '3600')))
+    except ValueError:
+        return 3600.0
+
+def get_max_attempts() -> int:
+    """Attempts (lease acquisitions) before a job whose workers keep dying is failed."""
+    try:
+        return max(1, int(os.getenv('JOB_MAX_ATTEMPTS', '3')))
+    except ValueError:
+        return 3
+
+class JobLease:
+    """A worker's time-limited claim on a PROCESSING job, kept alive by heartbeats."""
+
+    def __init__(self, job_id: int, owner: str):
+        self.job_id = job_id
+        self.owner = owner
+        self._renewed_at = time.monotonic()
+
+    @classmethod
+    def acquire(cls, job: VideoJob):
+        """Claim the job in the current transaction; the caller commits.
+
+        The job row should be locked (SELECT ... FOR UPDATE). Returns None
+        while another worker holds a live lease, which happens when a
+        message is delivered twice.
+        """
+        now = datetime.utcnow()
+        if job.status == JobStatus.PROCESSING and job.lease_owner and \
+                job.lease_expires_at and job.lease_expires_at > now:
+            return None
+
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        job.lease_owner = owner
+        job.lease_expires_at = now + timedelta(seconds=get_lease_ttl())
+        job.attempts = (job.attempts or 0) + 1
+        return cls(job.id, owner)
+
+    def heartbeat(self, force: bool = False):
+        """Extend the lease when due; raises LeaseLostError if it was taken over."""
+        if not force and time.monotonic() - self._renewed_at < get_heartbeat_interval():
+            return
+        renewed = VideoJob.query.filter_by(id=self.job_id, lease_owner=self.owner).update(
+            {'lease_expires_at': datetime.utcnow() + timedelta(seconds=get_lease_ttl())},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not renewed:
+            raise LeaseLostError(f"Lease on job {self.job_id} was lost")
+        self._renewed_at = time.monotonic()
+
+    def verify(self):
+        """Lock the job row and check the lease is still ours.
+
+        The lock lasts until the caller commits, so the reaper cannot take
+        the job between this check and the final status change.
+        """
+        owner = db.session.query(VideoJob.lease_owner).filter_by(id=self.job_id).with_for_update().scalar()
+        if owner != self.owner:
+            raise LeaseLostError(f"Lease on job {self.job_id} was lost")
+
+def release_lease(job: VideoJob):
+    job.lease_owner = None
+    job.lease_expires_at = None
+
+def reap_expired_leases() -> int:
+    """Requeue (or fail, after JOB_MAX_ATTEMPTS) jobs whose worker stopped heartbeating.
+
+    Requeued jobs go back to the dispatcher, which publishes them again;
+    the next attempt resumes from the job's checkpoint. Returns the number
+    of jobs reaped.
+    """
+    try:
+        now = datetime.utcnow()
+        ttl = timedelta(seconds=get_lease_ttl())
+        jobs = VideoJob.query.filter(
+            VideoJob.status == JobStatus.PROCESSING,
+            or_(
+                VideoJob.lease_expires_at < now,
+                # Jobs started before leases existed
+                and_(VideoJob.lease_expires_at.is_(None), VideoJob.updated_at < now - ttl)
+            )
+        ).with_for_update(skip_locked=True).all()
+        if not jobs:
+            db.session.rollback()
+            return 0
+
+        max_attempts = get_max_attempts()
+        failed = []
+        for job in jobs:
+            previous_status = job.status
+            release_lease(job)
+            if (job.attempts or 0) >= max_attempts:
+                job.status = JobStatus.FAILED
+                job.error_message = f"Worker stopped responding; gave up after {job.attempts} attempts"
+                failed.append(job)
+            else:
+                job.status = JobStatus.PENDING
+                job.dispatched_at = None
+                job.scheduling_note = f"Requeued after the worker lease expired (attempt {job.attempts})"
+            record_transition(job, previous_status)
+        db.session.commit()
+
+        for job in jobs:
+            publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+        for job in failed:
+            publish_notification(job.user_id, job.id, f"Video processing failed for {job.original_filename}: {job.error_message}")
+        print(f"Reaper: {len(jobs) - len(failed)} jobs requeued, {len(failed)} failed")
+        return len(jobs)
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error reaping expired leases: {e}")
+        return 0
+
+def fail_dead_lettered_job(job_id: int, error: Exception) -> bool:
+    """Fail a dispatched job whose message was dead-lettered.
+
+    Nothing will consume it anymore, and while it stays PENDING with
+    dispatched_at set it holds one of the user's fair-share slots. A job
+    already taken by a worker is left to the lease reaper.
+    """
+    try:
+        job = VideoJob.query.filter_by(id=job_id).with_for_update().first()
+        if not job or job.status != JobStatus.PENDING or job.dispatched_at is None:
+            db.session.rollback()
+            return False
+
+        previous_status = job.status
+        job.status = JobStatus.FAILED
+        job.error_message = f"Gave up after repeated delivery failures: {error}"
+        job.scheduling_note = 'Message dead-lettered'
+        record_transition(job, previous_status)
+        db.session.commit()
+
+        publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+        publish_notification(job.user_id, job.id, f"Video processing failed for {job.original_filename}: {job.error_message}")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error failing dead-lettered job {job_id}: {e}")
+        return False
+
+def requeue_stale_dispatches() -> int:
+    """Dispatch again PENDING jobs whose message was not consumed within
+    JOB_DISPATCH_TTL.
+
+    Covers messages dead-lettered while the database was unreachable (so
+    fail_dead_lettered_job could not run) or otherwise lost; without this
+    they would hold the user's fair-share slots forever. Should the old
+    message still be delivered, the worker skips the job once it is done
+    or leased. Returns the number of jobs requeued.
+    """
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=get_dispatch_ttl())
+        jobs = VideoJob.query.filter(
+            VideoJob.status == JobStatus.PENDING,
+            VideoJob.dispatched_at < cutoff
+        ).with_for_update(skip_locked=True).all()
+        if not jobs:
+            db.session.rollback()
+            return 0
+
+        for job in jobs:
+            job.dispatched_at = None
+            job.scheduling_note = 'Requeued: its message was not consumed in time'
+        db.session.commit()
+        print(f"Reaper: {len(jobs)} stale dispatches requeued")
+        return len(jobs)
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error requeueing stale dispatches: {e}")
+        return 0
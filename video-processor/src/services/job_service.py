@@ -0,0 +1,85 @@
+from src.models.video_job import db, VideoJob, JobStatus
+from src.services.encoding import apply_profile
+from src.services.job_stats import apply_stats_delta, completed_totals, merge_deltas, transition_delta
+from src.services.media_probe import apply_media_info
+from src.services.output_store import complete_from_output, find_reusable_outputs, remove_file
+from src.services.scheduler import DEFAULT_PRIORITY_CLASS, dispatch_pending_jobs
+from src.services.storage_manager import retention_expiry
+from src.services.tracing import current_traceparent
+
+def create_video_jobs(user_id: int, uploads: list, profile: dict,
+                      priority_class: str = DEFAULT_PRIORITY_CLASS) -> list:
+    """Create jobs for (filename, file_path, content_digest, media_info) uploads in one commit.
+
+    Uploads whose content was already processed with the same profile
+    complete at once by reusing that archive; nothing is queued for them
+    and the uploaded copy is discarded. All other jobs are handed to the
+    dispatcher in a single pass.
+    """
+    existing_outputs = find_reusable_outputs([upload[2] for upload in uploads], profile)
+    
+    video_jobs = []
+    reused_files = []
+    stats_deltas = []
+    trace_parent = current_traceparent()
+    for filename, file_path, content_digest, media_info in uploads:
+        video_job = VideoJob(
+            user_id=user_id,
+            original_filename=filename,
+            file_path=file_path,
+            content_digest=content_digest,
+            status=JobStatus.PENDING,
+            priority_class=priority_class,
+            scheduling_note='Waiting for a fair-share slot',
+            trace_parent=trace_parent
+        )
+        apply_profile(video_job, profile)
+        apply_media_info(video_job, media_info)
+        
+        # Same content with the same profile already processed: reuse it
+        existing_output = existing_outputs.get(content_digest)
+        if existing_output:
+            complete_from_output(video_job, existing_output)
+            video_job.processing_metadata = {'output_bytes': existing_output.size_bytes or 0}
+            video_job.expires_at = retention_expiry(video_job.completed_at)
+            video_job.scheduling_note = None
+            reused_files.append(file_path)
+            stats_deltas.append(completed_totals(video_job))
+        stats_deltas.append(transition_delta(None, video_job.status, video_job.frame_count or 0))
+        video_jobs.append(video_job)
+    
+    db.session.add_all(video_jobs)
+    db.session.flush()
+    apply_stats_delta(user_id, merge_deltas(*stats_deltas))
+    db.session.commit()
+    
+    for file_path in reused_files:
+        remove_file(file_path)
+    
+    # Queue them now if the user has free slots; otherwise later passes will
+    if len(reused_files) < len(video_jobs):
+        dispatch_pending_jobs()
+    return video_jobs
+
+def create_video_job(user_id: int, filename: str, file_path: str, content_digest: str, profile: dict,
+                     priority_class: str = DEFAULT_PRIORITY_CLASS, media_info: dict = None) -> VideoJob:
+    """Create the job for an uploaded file and hand it to the dispatcher."""
+    uploads = [(filename, file_path, content_digest, media_info)]
+    return create_video_jobs(user_id, uploads, profile, priority_class)[0]
+
+def job_created_response(video_job: VideoJob) -> dict:
+    """Response body returned to clients after creating a job."""
+    if video_job.status == JobStatus.COMPLETED:
+        return {
+            'message': 'Video already processed, existing result reused',
+            'job_id': video_job.id,
+            'status': video_job.status.value,
+            'deduplicated': True
+        }
+    return {
+        'message': 'Video uploaded successfully and queued for processing',
+        'job_id': video_job.id,
+        'status': video_job.status.value,
+        'priority_class': video_job.priority_class,
+        'dispatched': video_job.dispatched_at is not None
+    }
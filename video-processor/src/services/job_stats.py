@@ -0,0 +1,160 @@
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from src.models.video_job import db, VideoJob, JobStatus
+from src.models.video_output import VideoOutput
+from src.models.user_job_stats import UserJobStats
+
+STATUS_COLUMNS = {
+    JobStatus.PENDING: 'pending_jobs',
+    JobStatus.PROCESSING: 'processing_jobs',
+    JobStatus.COMPLETED: 'completed_jobs',
+    JobStatus.FAILED: 'failed_jobs'
+}
+
+def transition_delta(old_status, new_status, frames: int = 0) -> dict:
+    """Counter changes for a job moving from old_status to new_status.
+
+    None stands for a job that does not exist yet (creation) or anymore
+    (deletion). frames is the job's frame count, added while it is
+    completed.
+    """
+    delta = {}
+    if old_status is None:
+        delta['total_jobs'] = 1
+    if new_status is None:
+        delta['total_jobs'] = delta.get('total_jobs', 0) - 1
+    if old_status != new_status:
+        if old_status is not None:
+            delta[STATUS_COLUMNS[old_status]] = -1
+        if new_status is not None:
+            delta[STATUS_COLUMNS[new_status]] = delta.get(STATUS_COLUMNS[new_status], 0) + 1
+        if frames and new_status == JobStatus.COMPLETED:
+            delta['total_frames'] = frames
+        elif frames and old_status == JobStatus.COMPLETED:
+            delta['total_frames'] = -frames
+    return delta
+
+def completed_totals(job: VideoJob) -> dict:
+    """What a completed job adds to the bytes and timing counters.
+
+    The counters cover the user's existing jobs, like the status counts:
+    an evicted result still counts (its size is kept in
+    processing_metadata), a deleted job no longer does.
+    """
+    metadata = job.processing_metadata or {}
+    totals = {'bytes_produced': int(metadata.get('output_bytes') or 0)}
+    if metadata.get('processing_seconds') is not None:
+        totals['processing_seconds'] = metadata['processing_seconds']
+        totals['timed_jobs'] = 1
+    return totals
+
+def merge_deltas(*deltas) -> dict:
+    merged = {}
+    for delta in deltas:
+        for column, value in delta.items():
+            merged[column] = merged.get(column, 0) + value
+    return merged
+
+def _aggregate(user_id: int) -> dict:
+    """Counters recomputed from video_jobs with one grouped query.
+
+    Gives the same row as the incremental updates (see completed_totals);
+    jobs completed before output_bytes was recorded fall back to the size
+    of the archive they still reference.
+    """
+    values = {column: 0 for column in STATUS_COLUMNS.values()}
+    values.update(total_jobs=0, total_frames=0, bytes_produced=0, processing_seconds=0, timed_jobs=0)
+    seconds = VideoJob.processing_metadata['processing_seconds'].as_float()
+    rows = db.session.query(
+        VideoJob.status,
+        func.count(VideoJob.id),
+        func.coalesce(func.sum(VideoJob.frame_count), 0),
+        func.coalesce(func.sum(func.coalesce(
+            VideoJob.processing_metadata['output_bytes'].as_integer(), VideoOutput.size_bytes
+        )), 0),
+        func.coalesce(func.sum(seconds), 0),
+        func.count(seconds)
+    ).outerjoin(VideoOutput, VideoOutput.id == VideoJob.output_id) \
+     .filter(VideoJob.user_id == user_id) \
+     .group_by(VideoJob.status).all()
+
+    for status, count, frames, size, processing_seconds, timed_jobs in rows:
+        values['total_jobs'] += count
+        if status in STATUS_COLUMNS:
+            values[STATUS_COLUMNS[status]] = count
+        if status == JobStatus.COMPLETED:
+            values['total_frames'] = int(frames)
+            values['bytes_produced'] = int(size)
+            values['processing_seconds'] = float(processing_seconds)
+            values['timed_jobs'] = int(timed_jobs)
+    return values
+
+def _increment(user_id: int, delta: dict) -> int:
+    values = {column: getattr(UserJobStats, column) + amount for column, amount in delta.items()}
+    values['updated_at'] = datetime.utcnow()
+    return UserJobStats.query.filter_by(user_id=user_id).update(values, synchronize_session=False)
+
+def apply_stats_delta(user_id: int, delta: dict):
+    """Apply counter changes in the current transaction (the caller commits).
+
+    Call after the job changes are flushed. A user without a counter row
+    gets one rebuilt from video_jobs, which already includes this change.
+    """
+    delta = {column: amount for column, amount in delta.items() if amount}
+    if not delta:
+        return
+    if _increment(user_id, delta):
+        return
+
+    db.session.flush()
+    values = _aggregate(user_id)
+    inserted = db.session.execute(
+        insert(UserJobStats).values(user_id=user_id, updated_at=datetime.utcnow(), **values)
+        .on_conflict_do_nothing(index_elements=['user_id'])
+    ).rowcount
+    if not inserted:
+        # Another transaction created the row meanwhile, without our change
+        _increment(user_id, delta)
+
+def record_transition(job: VideoJob, old_status):
+    """Update the owner's counters after job.status changed from old_status.
+
+    A job becoming completed also adds its completed_totals; set
+    processing_metadata before calling.
+    """
+    delta = transition_delta(old_status, job.status, job.frame_count or 0)
+    if job.status == JobStatus.COMPLETED and old_status != JobStatus.COMPLETED:
+        delta = merge_deltas(delta, completed_totals(job))
+    apply_stats_delta(job.user_id, delta)
+
+def record_deletion(job: VideoJob):
+    """Update the owner's counters for a deleted job."""
+    delta = transition_delta(job.status, None, job.frame_count or 0)
+    if job.status == JobStatus.COMPLETED:
+        delta = merge_deltas(delta, {column: -amount for column, amount in completed_totals(job).items()})
+    apply_stats_delta(job.user_id, delta)
+
+def stats_drift(user_id: int) -> dict:
+    """Counters whose incremental value differs from a rebuild from
+    video_jobs: {column: {'counter': ..., 'rebuilt': ...}}. Empty when
+    they agree, as they should after any sequence of changes."""
+    stats = UserJobStats.query.get(user_id)
+    drift = {}
+    for column, rebuilt in _aggregate(user_id).items():
+        counter = getattr(stats, column) if stats else 0
+        if round(float(counter), 3) != round(float(rebuilt), 3):
+            drift[column] = {'counter': counter, 'rebuilt': rebuilt}
+    return drift
+
+def get_user_stats(user_id: int) -> UserJobStats:
+    """The user's counters, building the row on first use."""
+    stats = UserJobStats.query.get(user_id)
+    if stats is None:
+        db.session.execute(
+            insert(UserJobStats).values(user_id=user_id, updated_at=datetime.utcnow(), **_aggregate(user_id))
+            .on_conflict_do_nothing(index_elements=['user_id'])
+        )
+        db.session.commit()
+        stats = UserJobStats.query.get(user_id)
+    return stats
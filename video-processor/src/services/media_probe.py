@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+from src.services.cache_service import get_media_probe, store_media_probe
+
+# Packets decoded to prove the video stream is readable
+PROBE_DECODE_PACKETS = 8
+
+def get_timeout_base() -> float:
+    """Seconds every ffmpeg run is allowed regardless of video length."""
+    try:
+        return max(30.0, float(os.getenv('FFMPEG_TIMEOUT_BASE', '300')))
+    except ValueError:
+        return 300.0
+
+def get_timeout_per_second() -> float:
+    """Extra ffmpeg seconds allowed per second of video."""
+    try:
+        return max(0.0, float(os.getenv('FFMPEG_TIMEOUT_PER_SECOND', '1.5')))
+    except ValueError:
+        return 1.5
+
+def processing_timeout(duration: float = None) -> int:
+    """ffmpeg timeout for a video, growing with its duration."""
+    return int(get_timeout_base() + get_timeout_per_second() * (duration or 0))
+
+def _number(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+def probe_media(video_path: str) -> dict:
+    """Read duration, resolution, codec and stream count with ffprobe.
+
+    The first packets of the video stream are decoded as well, so files
+    that only look like videos are caught. Raises ValueError with a
+    client-facing message when the file cannot be decoded.
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-count_frames',
+        '-read_intervals', f'%+#{PROBE_DECODE_PACKETS}',
+        '-show_entries', 'format=duration,nb_streams,format_name:stream=codec_name,width,height,nb_read_frames',
+        '-of', 'json',
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        raise ValueError("Video could not be read: probing timed out")
+    if result.returncode != 0:
+        raise ValueError(f"Video could not be read: {result.stderr.strip()[:200]}")
+
+    try:
+        info = json.loads(result.stdout or '{}')
+    except ValueError:
+        raise ValueError("Video could not be read: unexpected probe output")
+
+    streams = info.get('streams') or []
+    if not streams:
+        raise ValueError("File has no video stream")
+    stream = streams[0]
+    if not _number(stream.get('nb_read_frames'), int):
+        raise ValueError("Video stream could not be decoded")
+
+    file_format = info.get('format') or {}
+    return {
+        'duration': _number(file_format.get('duration')),
+        'width': _number(stream.get('width'), int),
+        'height': _number(stream.get('height'), int),
+        'codec': stream.get('codec_name'),
+        'stream_count': _number(file_format.get('nb_streams'), int),
+        'container': file_format.get('format_name')
+    }
+
+def probe_upload(video_path: str, content_digest: str = None) -> dict:
+    """probe_media with results cached by content digest."""
+    media_info = get_media_probe(content_digest)
+    if media_info is not None:
+        return media_info
+
+    media_info = probe_media(video_path)
+    store_media_probe(content_digest, media_info)
+    return media_info
+
+def apply_media_info(job, media_info: dict):
+    """Store probe results on a VideoJob."""
+    if not media_info:
+        return
+    job.duration_seconds = media_info.get('duration')
+    job.width = media_info.get('width')
+    job.height = media_info.get('height')
+    job.video_codec = media_info.get('codec')
+    job.stream_count = media_info.get('stream_count')
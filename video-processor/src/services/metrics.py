@@ -0,0 +1,147 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+from opentelemetry import trace
+from src.services.retry_policy import ATTEMPTS_HEADER
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status']
+)
+STAGE_DURATION = Histogram(
+    'video_stage_duration_seconds',
+    'Duration of video job stages (ffmpeg extraction, dedup, zip archiving)',
+    ['stage', 'pipeline'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+QUEUE_CONSUME_LAG = Histogram(
+    'queue_consume_lag_seconds',
+    'Time a message waited in its queue before a consumer took it',
+    ['queue'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+)
+JOBS_PROCESSED = Counter(
+    'video_jobs_processed_total',
+    'Video jobs finished by a worker, by final status',
+    ['status']
+)
+
+PUBLISHED_AT_HEADER = 'x-published-at'
+
+def get_metrics_port() -> int:
+    """Port of the standalone worker's metrics server."""
+    try:
+        return int(os.getenv('METRICS_PORT', '9100'))
+    except ValueError:
+        return 9100
+
+# (metric, help, QueuePool method)
+POOL_METRICS = (
+    ('db_pool_size', 'Connections the SQLAlchemy pool keeps open', 'size'),
+    ('db_pool_checked_out', 'Pool connections currently in use', 'checkedout'),
+    ('db_pool_overflow', 'Connections open beyond the pool size', 'overflow')
+)
+
+class DatabasePoolCollector:
+    """Read the SQLAlchemy pool usage at scrape time."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def collect(self):
+        for name, documentation, method in POOL_METRICS:
+            # NullPool and friends do not track usage; report 0 rather than fail
+            value = getattr(self.pool, method)() if hasattr(self.pool, method) else 0
+            yield GaugeMetricFamily(name, documentation, value=float(value))
+
+def init_metrics(app, db):
+    """Time every request by route template, export the database pool
+    usage and serve /metrics."""
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+    # Not exported by the multiprocess worker server, whose consumer
+    # processes each have their own pool
+    with app.app_context():
+        REGISTRY.register(DatabasePoolCollector(db.engine.pool))
+
+def start_worker_metrics_server():
+    """Serve the metrics of every consumer process from the supervisor.
+
+    With PROMETHEUS_MULTIPROC_DIR set (it must be, before prometheus_client
+    is imported) each consumer process writes its samples there and they
+    are merged on scrape. Call before the consumers start: leftovers of a
+    previous run are removed.
+    """
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if not multiproc_dir:
+        start_http_server(get_metrics_port())
+        return
+
+    from prometheus_client import multiprocess
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(get_metrics_port(), registry=registry)
+
+tracer = trace.get_tracer(__name__)
+
+@contextmanager
+def timed_stage(stage: str, pipeline: str, timings=None):
+    """Trace a job stage as a span and observe its duration when it
+    completes without raising; timings (StageTimings) records it for the
+    job itself."""
+    with tracer.start_as_current_span(f"video.{stage}", attributes={'video.pipeline': pipeline}):
+        started = time.monotonic()
+        if timings is None:
+            yield
+        else:
+            with timings.stage(stage):
+                yield
+        STAGE_DURATION.labels(stage, pipeline).observe(time.monotonic() - started)
+
+def published_headers() -> dict:
+    """Headers stamping a message with its publish time, for consume lag."""
+    return {PUBLISHED_AT_HEADER: time.time()}
+
+def queue_wait_seconds(properties):
+    """Seconds since the message was published (x-published-at), or None."""
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return max(0.0, time.time() - float(headers[PUBLISHED_AT_HEADER]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def observe_consume_lag(queue_name: str, properties):
+    """Record how long a first delivery waited, from its x-published-at header.
+
+    Retried messages also sat in a delay queue on purpose; they are skipped.
+    """
+    headers = getattr(properties, 'headers', None) or {}
+    waited = queue_wait_seconds(properties)
+    if waited is None or headers.get(ATTEMPTS_HEADER):
+        return
+    QUEUE_CONSUME_LAG.labels(queue_name).observe(waited)
@@ -0,0 +1,139 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from src.models.video_job import db, VideoJob, JobStatus
+from src.models.video_output import VideoOutput
+from src.services.encoding import profile_key
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def save_and_hash(stream, file_path: str) -> str:
+    """Write an upload stream to disk, hashing it on the way through."""
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as out:
+        while True:
+            chunk = stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+def find_reusable_outputs(content_digests, profile: dict) -> dict:
+    """Existing archives for the same profile, keyed by content digest (one query)."""
+    outputs = VideoOutput.query.filter(
+        VideoOutput.content_digest.in_(set(content_digests)),
+        VideoOutput.profile_key == profile_key(profile)
+    ).order_by(VideoOutput.created_at.desc()).all()
+
+    found = {}
+    for output in outputs:
+        if output.content_digest not in found and os.path.exists(output.zip_file_path):
+            found[output.content_digest] = output
+    return found
+
+def find_reusable_output(content_digest: str, profile: dict):
+    """Return an existing archive for the same content and profile, if any."""
+    return find_reusable_outputs([content_digest], profile).get(content_digest)
+
+def complete_from_output(job: VideoJob, output: VideoOutput):
+    """Complete a job by linking it to an existing archive (no extraction)."""
+    output = VideoOutput.query.filter_by(id=output.id).with_for_update().one()
+    output.ref_count += 1
+    output.last_accessed_at = datetime.utcnow()
+
+    job.output_id = output.id
+    job.zip_file_path = output.zip_file_path
+    job.frame_count = output.frame_count
+    job.status = JobStatus.COMPLETED
+    job.progress = 100
+    job.completed_at = datetime.utcnow()
+
+def register_output(job: VideoJob, profile: dict) -> VideoOutput:
+    """Record a freshly produced archive, owned by the job that produced it."""
+    output = VideoOutput(
+        content_digest=job.content_digest or '',
+        profile_key=profile_key(profile),
+        zip_file_path=job.zip_file_path,
+        frame_count=job.frame_count,
+        size_bytes=os.path.getsize(job.zip_file_path),
+        ref_count=1
+    )
+    db.session.add(output)
+    db.session.flush()
+    job.output_id = output.id
+    return output
+
+def _release_reference(job_id: int, output_id: int, zip_file_path: str):
+    if output_id:
+        output = VideoOutput.query.filter_by(id=output_id).with_for_update().first()
+        if not output:
+            return None
+        output.ref_count -= 1
+        if output.ref_count > 0:
+            return None
+        db.session.delete(output)
+        return output.zip_file_path
+
+    if zip_file_path:
+        # Jobs from before reference counting: only release unshared files
+        shared = VideoJob.query.filter(
+            VideoJob.zip_file_path == zip_file_path,
+            VideoJob.id != job_id
+        ).count()
+        if not shared:
+            return zip_file_path
+    return None
+
+def release_output(job: VideoJob):
+    """Drop a job's reference to its archive.
+
+    Call after the job row has been deleted (and flushed) in the current
+    transaction. Returns the archive path once no other job references it,
+    so the caller can remove the file after committing; otherwise None.
+    """
+    return _release_reference(job.id, job.output_id, job.zip_file_path)
+
+def _mark_evicted(job: VideoJob, reason: str):
+    job.output_id = None
+    job.zip_file_path = None
+    job.evicted_at = datetime.utcnow()
+    job.eviction_reason = reason
+
+def expire_job_output(job: VideoJob, reason: str = 'expired'):
+    """Drop a job's archive but keep the job, marked as evicted.
+
+    Returns the archive path to remove after committing, or None while
+    other jobs still share it.
+    """
+    output_id, zip_file_path = job.output_id, job.zip_file_path
+    _mark_evicted(job, reason)
+    db.session.flush()
+    return _release_reference(job.id, output_id, zip_file_path)
+
+def evict_output(output: VideoOutput, reason: str) -> str:
+    """Remove a shared archive from every job using it; returns its path."""
+    for job in VideoJob.query.filter_by(output_id=output.id).with_for_update().all():
+        _mark_evicted(job, reason)
+    db.session.flush()
+    db.session.delete(output)
+    return output.zip_file_path
+
+def touch_output(job: VideoJob, min_interval: timedelta = timedelta(hours=1)):
+    """Record that a job's archive was read, for LRU eviction.
+
+    Skips the write when the archive was already touched recently.
+    """
+    if not job.output_id:
+        return
+    now = datetime.utcnow()
+    VideoOutput.query.filter(
+        VideoOutput.id == job.output_id,
+        VideoOutput.last_accessed_at < now - min_interval
+    ).update({'last_accessed_at': now}, synchronize_session=False)
+    db.session.commit()
+
+def remove_file(path: str):
+    """Remove a file if it still exists."""
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,36 @@
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+from src.models.video_job import VideoJob
+
+MAX_PER_PAGE = 100
+
+def encode_cursor(job: VideoJob) -> str:
+    """Opaque cursor pointing just after job in (created_at, id) descending order."""
+    raw = f"{job.created_at.isoformat()}|{job.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """(created_at, id) from a cursor; raises ValueError when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, job_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(job_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_page(query, per_page: int, cursor: str = None) -> tuple:
+    """One page of jobs, newest first, seeking past the cursor instead of OFFSET.
+
+    Returns (jobs, next_cursor); next_cursor is None on the last page.
+    Served by idx_video_jobs_user_created (user_id, created_at DESC, id DESC).
+    """
+    if cursor:
+        created_at, job_id = decode_cursor(cursor)
+        query = query.filter(tuple_(VideoJob.created_at, VideoJob.id) < tuple_(created_at, job_id))
+
+    # One extra row tells whether another page exists, without a COUNT
+    jobs = query.order_by(VideoJob.created_at.desc(), VideoJob.id.desc()).limit(per_page + 1).all()
+    if len(jobs) > per_page:
+        return jobs[:per_page], encode_cursor(jobs[per_page - 1])
+    return jobs, None
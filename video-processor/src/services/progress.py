@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from src.models.video_job import db
+from src.services.cache_service import publish_job_progress
+
+def get_progress_min_delta() -> int:
+    """Smallest progress change (in percent) that is written immediately."""
+    try:
+        return max(1, int(os.getenv('PROGRESS_MIN_DELTA', '5')))
+    except ValueError:
+        return 5
+
+def get_progress_min_interval() -> float:
+    """Seconds after which any progress change is written."""
+    try:
+        return max(0.5, float(os.getenv('PROGRESS_MIN_INTERVAL', '10')))
+    except ValueError:
+        return 10.0
+
+class ProgressReporter:
+    """Turn ffmpeg progress into throttled VideoJob.progress updates.
+
+    ffmpeg reader threads call update() with the media time each segment
+    has reached; the worker thread calls flush(), which is the only place
+    that touches the database session. A write happens when progress moved
+    by at least PROGRESS_MIN_DELTA percent or PROGRESS_MIN_INTERVAL seconds
+    passed since the last write. Every write is mirrored to Redis.
+
+    Without a duration (containers that do not record one) progress is
+    indeterminate and stays at start until the job finishes.
+    """
+
+    def __init__(self, job, duration: float, start: int = 0, end: int = 95):
+        self._job = job
+        self._duration = max(duration, 0.001) if duration else None
+        self._start = start
+        self._end = end
+        self._lock = threading.Lock()
+        self._segment_seconds = {}
+        self._min_delta = get_progress_min_delta()
+        self._min_interval = get_progress_min_interval()
+        self._written = job.progress or 0
+        self._written_at = time.monotonic()
+
+    def update(self, segment_index: int, seconds: float):
+        """Record the media time reached by one segment (thread-safe)."""
+        with self._lock:
+            self._segment_seconds[segment_index] = seconds
+
+    def current(self) -> int:
+        if self._duration is None:
+            return self._start
+        with self._lock:
+            done = sum(self._segment_seconds.values())
+        fraction = min(done / self._duration, 1.0)
+        return self._start + int(fraction * (self._end - self._start))
+
+    def flush(self, force: bool = False):
+        """Write progress if it changed enough or enough time passed."""
+        progress = self.current()
+        if progress <= self._written:
+            return
+
+        elapsed = time.monotonic() - self._written_at
+        if not force and progress - self._written < self._min_delta and elapsed < self._min_interval:
+            return
+
+        self._job.progress = progress
+        db.session.commit()
+        self._written = progress
+        self._written_at = time.monotonic()
+        publish_job_progress(self._job.id, self._job.user_id, self._job.status.value, progress)
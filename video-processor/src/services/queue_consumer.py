@@ -1,113 +1,289 @@
 import pika
 import json
 import os
-import subprocess
+import shutil
+import threading
+import time
 import uuid
-import zipfile
 from datetime import datetime
 from src.models.video_job import db, VideoJob, JobStatus
-from src.services.queue_service import get_rabbitmq_connection, publish_notification
-from flask import current_app
+from src.services.queue_service import VIDEO_QUEUES, get_rabbitmq_connection, publish_notification
+from src.services.cache_service import publish_job_progress
+from src.services.checkpoint import SegmentCheckpoint, checkpoints_enabled, job_work_dir
+from src.services.encoding import profile_from_job, profile_key
+from src.services.frame_dedup import drop_near_duplicates
+from src.services.job_stats import record_transition
+from src.services.frame_extractor import (
+    archive_frame_files, extract_frames, get_frame_pipeline, get_min_segment_seconds, get_segment_count,
+    probe_duration, stream_frames_to_zip
+)
+from src.services.job_lease import JobLease, LeaseLostError, fail_dead_lettered_job, release_lease
+from src.services.output_store import register_output
+from src.services.media_probe import processing_timeout
+from src.services.metrics import JOBS_PROCESSED, STAGE_DURATION, observe_consume_lag, queue_wait_seconds, timed_stage
+from src.services.tracing import consumer_span
+from src.services.progress import ProgressReporter
+from src.services.retry_policy import PoisonMessageError, dead_letter_queue_name, settle_failed_delivery
+from src.services.scheduler import dispatch_pending_jobs
+from src.services.stage_timings import StageTimings, file_size
+from src.services.storage_manager import (
+    StorageFullError, ensure_free_space, get_storage_retry_delay, is_disk_full_error, retention_expiry
+)
 
-def process_video_frames(job_id: int) -> bool:
-    """Process video and extract frames."""
+def _job_checkpoint(job: VideoJob, pipeline: str, segments: int, duration: float, profile: dict):
+    """Checkpoint of the job's finished segments, or None when disabled."""
+    if not checkpoints_enabled():
+        return None
+    return SegmentCheckpoint(job_work_dir(job.id), {
+        'pipeline': pipeline,
+        'file_path': job.file_path,
+        'segments': segments,
+        'min_segment_seconds': get_min_segment_seconds(),
+        'duration': duration,
+        'profile': profile_key(profile)
+    })
+
+def _save_stage_timings(job: VideoJob, timings: StageTimings):
+    """Store the final timings (cleanup and notify run after the job commit)."""
     try:
-        # Get job from database
-        job = VideoJob.query.get(job_id)
+        job.stage_timings = timings.to_dict()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not save stage timings of job {job.id}: {e}")
+
+def process_video_frames(job_id: int, queue_wait: float = None) -> bool:
+    """Process video and extract frames.
+    
+    Safe to run more than once for a job: completed jobs are skipped, a job
+    another worker holds a live lease on is left to it, and a retried job
+    resumes from the segments earlier attempts finished. Wall and CPU time
+    of every stage (queue_wait: seconds since the message was published)
+    are stored on the job.
+    """
+    lease = None
+    timings = None
+    try:
+        # Make room before writing, if the shared volume is nearly full
+        ensure_free_space()
+        
+        # Get job from database, locked while the lease is taken
+        job = VideoJob.query.filter_by(id=job_id).with_for_update().first()
         if not job:
+            db.session.rollback()
             print(f"Job {job_id} not found")
             return False
         
+        if job.status == JobStatus.COMPLETED:
+            db.session.rollback()
+            print(f"Job {job_id} already completed, skipping duplicate message")
+            return True
+        
+        lease = JobLease.acquire(job)
+        if lease is None:
+            db.session.rollback()
+            print(f"Job {job_id} is leased by another worker, skipping duplicate message")
+            return True
+        
+        profile = profile_from_job(job)
+        
         # Update status to processing
+        previous_status = job.status
         job.status = JobStatus.PROCESSING
-        job.progress = 10
+        job.progress = 0
+        record_transition(job, previous_status)
         db.session.commit()
+        started = time.monotonic()
+        pipeline = get_frame_pipeline()
+        timings = StageTimings(pipeline)
+        if queue_wait is not None:
+            timings.add('queue_wait', queue_wait)
+        timings.bytes_in = file_size(job.file_path)
+        publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+        
+        # Create ZIP file path
+        output_dir = "/app/storage/outputs"
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Create temp directory for frames
-        temp_dir = f"/app/storage/temp/{uuid.uuid4()}"
-        os.makedirs(temp_dir, exist_ok=True)
+        zip_filename = f"frames_{job.id}_{uuid.uuid4().hex[:8]}.zip"
+        zip_path = os.path.join(output_dir, zip_filename)
+        temp_dir = None
+        checkpoint = None
         
         try:
-            # Extract frames using ffmpeg
-            frame_pattern = os.path.join(temp_dir, "frame_%04d.png")
-            
-            cmd = [
-                'ffmpeg',
-                '-i', job.file_path,
-                '-vf', 'fps=1',
-                '-y',
-                frame_pattern
-            ]
-            
-            job.progress = 30
-            db.session.commit()
+            # Real progress comes from ffmpeg's -progress output, throttled.
+            # The duration was probed at upload; older jobs probe it here.
+            # Unknown (None) means a single segment, the base timeout and
+            # no progress until the end; the lease heartbeat still runs.
+            with timed_stage('probe', pipeline, timings):
+                duration = job.duration_seconds or probe_duration(job.file_path)
+                segments = get_segment_count()
+                checkpoint = _job_checkpoint(job, pipeline, segments, duration, profile)
+            reporter = ProgressReporter(job, duration, start=0, end=90)
+            timeout = processing_timeout(duration)
+            if checkpoint and checkpoint.resumed_segments:
+                print(f"Job {job_id}: resuming with {checkpoint.resumed_segments} segments from an earlier attempt")
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            def tick():
+                lease.heartbeat()
+                reporter.flush()
             
-            if result.returncode != 0:
-                raise Exception(f"FFmpeg error: {result.stderr}")
+            if pipeline == 'stream':
+                # Pipe frames from ffmpeg straight into the archive
+                with timed_stage('extract_archive', pipeline, timings):
+                    frame_count, dropped_timestamps = stream_frames_to_zip(
+                        job.file_path,
+                        zip_path,
+                        segments=segments,
+                        timeout=timeout,
+                        profile=profile,
+                        duration=duration,
+                        progress=reporter.update,
+                        on_tick=tick,
+                        checkpoint=checkpoint
+                    )
+            else:
+                # Extract frames to a temp directory, then pack them
+                temp_dir = checkpoint.work_dir if checkpoint else f"/app/storage/temp/{uuid.uuid4()}"
+                os.makedirs(temp_dir, exist_ok=True)
+                
+                with timed_stage('extract', pipeline, timings):
+                    frame_files, timestamps = extract_frames(
+                        job.file_path,
+                        temp_dir,
+                        segments=segments,
+                        timeout=timeout,
+                        profile=profile,
+                        duration=duration,
+                        progress=reporter.update,
+                        on_tick=tick,
+                        checkpoint=checkpoint
+                    )
+                reporter.flush(force=True)
+                lease.heartbeat(force=True)
+                
+                dropped_timestamps = []
+                if profile['drop_duplicates']:
+                    with timed_stage('dedup', pipeline, timings):
+                        frame_files, timestamps, dropped_timestamps = drop_near_duplicates(
+                            temp_dir, frame_files, timestamps, profile['duplicate_threshold']
+                        )
+                
+                frame_count = len(frame_files)
+                if frame_count > 0:
+                    with timed_stage('archive', pipeline, timings):
+                        archive_frame_files(
+                            temp_dir, frame_files, zip_path, profile, timestamps,
+                            dropped_timestamps if profile['drop_duplicates'] else None
+                        )
             
-            job.progress = 70
-            db.session.commit()
+            # Still ours? Holds the row until the commit below
+            lease.verify()
             
             # Count extracted frames
-            frame_files = [f for f in os.listdir(temp_dir) if f.endswith('.png')]
-            job.frame_count = len(frame_files)
+            job.frame_count = frame_count
+            if profile['drop_duplicates']:
+                job.processing_metadata = dict(job.processing_metadata or {}, dropped_duplicates={
+                    'count': len(dropped_timestamps),
+                    'threshold': profile['duplicate_threshold'],
+                    'timestamps': dropped_timestamps
+                })
             
-            if len(frame_files) == 0:
+            if frame_count == 0:
                 raise Exception("No frames were extracted from the video")
             
-            # Create ZIP file
-            output_dir = "/app/storage/outputs"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            zip_filename = f"frames_{job.id}_{uuid.uuid4().hex[:8]}.zip"
-            zip_path = os.path.join(output_dir, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for frame_file in frame_files:
-                    frame_path = os.path.join(temp_dir, frame_file)
-                    zipf.write(frame_path, frame_file)
-            
-            job.progress = 90
             job.zip_file_path = zip_path
-            db.session.commit()
-            
-            # Clean up temp directory
-            import shutil
-            shutil.rmtree(temp_dir)
-            
-            # Clean up original video file
-            if os.path.exists(job.file_path):
-                os.remove(job.file_path)
             
             # Update job status
             job.status = JobStatus.COMPLETED
             job.progress = 100
             job.completed_at = datetime.utcnow()
+            job.expires_at = retention_expiry(job.completed_at)
+            release_lease(job)
+            with timed_stage('register_output', pipeline, timings):
+                output = register_output(job, profile)
+            timings.bytes_out = output.size_bytes
+            job.stage_timings = timings.to_dict()
+            processing_seconds = round(time.monotonic() - started, 3)
+            job.processing_metadata = dict(
+                job.processing_metadata or {}, processing_seconds=processing_seconds, output_bytes=output.size_bytes
+            )
+            record_transition(job, JobStatus.PROCESSING)
             db.session.commit()
+            publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+            STAGE_DURATION.labels('total', pipeline).observe(processing_seconds)
+            JOBS_PROCESSED.labels('completed').inc()
+            
+            # Clean up the working directory and the original video file
+            # only now, so a failed commit can still be retried
+            with timed_stage('cleanup', pipeline, timings):
+                if checkpoint:
+                    checkpoint.discard()
+                elif temp_dir:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                if os.path.exists(job.file_path):
+                    os.remove(job.file_path)
             
             # Send notification
-            message = f"Video processing completed! {job.frame_count} frames extracted from {job.original_filename}"
-            publish_notification(job.user_id, job.id, message)
+            with timed_stage('notify', pipeline, timings):
+                message = f"Video processing completed! {job.frame_count} frames extracted from {job.original_filename}"
+                publish_notification(job.user_id, job.id, message)
+            _save_stage_timings(job, timings)
             
             print(f"Successfully processed job {job_id}: {job.frame_count} frames extracted")
             return True
             
         except Exception as e:
-            # Clean up temp directory on error
-            import shutil
-            if os.path.exists(temp_dir):
+            # Clean up the partial archive (and an uncheckpointed temp
+            # directory); checkpointed segments are kept for the retry
+            if temp_dir and not checkpoint and os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir)
+            if os.path.exists(zip_path):
+                os.remove(zip_path)
             raise e
+    
+    except LeaseLostError as e:
+        # The reaper gave the job to another worker; leave it alone
+        db.session.rollback()
+        print(f"Stopped job {job_id}: {e}")
+        return True
             
     except Exception as e:
-        # Update job status to failed
+        db.session.rollback()
         job = VideoJob.query.get(job_id)
+        if job and lease and job.lease_owner != lease.owner:
+            print(f"Error processing job {job_id} after losing its lease: {e}")
+            return True
+        
+        if is_disk_full_error(e):
+            # A full volume is not the job's fault: free space and retry it
+            if job:
+                previous_status = job.status
+                job.status = JobStatus.PENDING
+                job.progress = 0
+                job.scheduling_note = 'Storage full, waiting to retry'
+                release_lease(job)
+                record_transition(job, previous_status)
+                db.session.commit()
+                publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+            ensure_free_space(force=True)
+            print(f"Storage full while processing job {job_id}, requeueing")
+            raise StorageFullError(str(e)) from e
+        
+        # Update job status to failed
         if job:
+            previous_status = job.status
             job.status = JobStatus.FAILED
             job.error_message = str(e)
+            if timings:
+                # Partial: shows the stage that failed and what came before
+                job.stage_timings = timings.to_dict()
+            release_lease(job)
+            record_transition(job, previous_status)
             db.session.commit()
+            publish_job_progress(job.id, job.user_id, job.status.value, job.progress)
+            shutil.rmtree(job_work_dir(job.id), ignore_errors=True)
+            JOBS_PROCESSED.labels('failed').inc()
             
             # Send error notification
             message = f"Video processing failed for {job.original_filename}: {str(e)}"
@@ -116,71 +292,153 @@ def process_video_frames(job_id: int) -> bool:
         print(f"Error processing job {job_id}: {e}")
         return False
 
-def process_video_message(ch, method, properties, body):
-    """Process video processing message from queue."""
+def _message_job_id(body) -> int:
     try:
         message = json.loads(body)
-        job_id = message.get('job_id')
-        
-        if not job_id:
-            print("Invalid message: missing job_id")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
-        
-        print(f"Processing video job {job_id}")
-        
-        # Process the video
-        success = process_video_frames(job_id)
-        
-        if success:
-            print(f"Successfully processed job {job_id}")
-        else:
-            print(f"Failed to process job {job_id}")
-        
-        # Acknowledge message
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
-    except Exception as e:
-        print(f"Error processing message: {e}")
-        # Reject message and requeue
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+    except ValueError as e:
+        raise PoisonMessageError(f"Invalid JSON: {e}") from e
+    job_id = message.get('job_id') if isinstance(message, dict) else None
+    
+    if not job_id:
+        raise PoisonMessageError("Invalid message: missing job_id")
+    return job_id
+
+def handle_video_message(body, properties=None):
+    """Handle one video processing message.
+    
+    Raises PoisonMessageError for a message that can never be processed,
+    StorageFullError when it should wait for free space, and any other
+    exception for a transient failure worth retrying.
+    """
+    job_id = _message_job_id(body)
+    
+    print(f"Processing video job {job_id}")
+    
+    # Process the video; job-level failures are recorded on the job itself
+    success = process_video_frames(job_id, queue_wait_seconds(properties))
+    
+    if success:
+        print(f"Successfully processed job {job_id}")
+    else:
+        print(f"Failed to process job {job_id}")
 
-def start_queue_consumer():
-    """Start consuming messages from video processing queue."""
+def _process_delivery(app, connection, properties, body, queue_name: str) -> dict:
+    """Run a message in a helper thread while this thread keeps the AMQP
+    connection serviced, so long ffmpeg runs do not miss heartbeats.
+    
+    Returns {'error': exception or None, 'requeue': bool}.
+    """
+    outcome = {'error': None, 'requeue': False}
+    
+    def run():
+        with app.app_context():
+            try:
+                # Continues the trace of the upload that created the job
+                with consumer_span(queue_name, properties):
+                    handle_video_message(body, properties)
+            except StorageFullError:
+                # Not the message's fault: give eviction a moment, then put
+                # it back without spending one of its attempts
+                time.sleep(get_storage_retry_delay())
+                outcome['requeue'] = True
+            except Exception as e:
+                print(f"Error processing message: {e}")
+                outcome['error'] = e
+            # This user's slot is free now; let their next job in
+            dispatch_pending_jobs()
+    
+    handler = threading.Thread(target=run, name='video-job', daemon=True)
+    handler.start()
+    while handler.is_alive():
+        connection.process_data_events(time_limit=1)
+        handler.join(timeout=0)
+    return outcome
+
+def _release_dead_lettered(app, body, error: Exception):
+    """Fail the job of a dead-lettered message, freeing its fair-share slot."""
+    try:
+        job_id = _message_job_id(body)
+    except PoisonMessageError:
+        return
+    with app.app_context():
+        if fail_dead_lettered_job(job_id, error):
+            JOBS_PROCESSED.labels('failed').inc()
+            dispatch_pending_jobs()
+
+def _handle_delivery(app, connection, channel, method, properties, body, queue_name: str):
+    observe_consume_lag(queue_name, properties)
+    outcome = _process_delivery(app, connection, properties, body, queue_name)
+    if outcome['requeue']:
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+    elif outcome['error'] is not None:
+        # Retry after a backoff delay, or dead-letter it
+        target = settle_failed_delivery(channel, method, properties, body, queue_name, outcome['error'])
+        if target == dead_letter_queue_name(queue_name):
+            _release_dead_lettered(app, body, outcome['error'])
+    else:
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+def start_queue_consumer(app, prefetch_count: int = 1, stop_event: threading.Event = None):
+    """Start consuming messages from the video processing queues.
+    
+    Interactive jobs are consumed as they arrive; a batch job is only taken
+    when the interactive queue is idle, and while it runs no interactive
+    message is held back by this consumer.
+    
+    Runs until stop_event is set. A stop request lets the message in
+    progress finish and be acknowledged; messages prefetched but not yet
+    started are returned to the queue.
+    """
     print("Starting video processing queue consumer...")
+    stop_event = stop_event or threading.Event()
     
     # Setup queues first
     from src.services.queue_service import setup_queues
     setup_queues()
     
-    while True:
+    while not stop_event.is_set():
         try:
             connection = get_rabbitmq_connection()
             if not connection:
                 print("Failed to connect to RabbitMQ, retrying in 5 seconds...")
-                import time
-                time.sleep(5)
+                stop_event.wait(5)
                 continue
             
             channel = connection.channel()
-            channel.queue_declare(queue='video_processing', durable=True)
+            for queue_name in VIDEO_QUEUES.values():
+                channel.queue_declare(queue=queue_name, durable=True)
+            # Confirm retry and dead-letter publishes before acking the original
+            channel.confirm_delivery()
             
-            # Set QoS to process one message at a time
-            channel.basic_qos(prefetch_count=1)
-            
-            channel.basic_consume(
-                queue='video_processing',
-                on_message_callback=process_video_message
-            )
+            # Limit unacknowledged messages held by this consumer
+            channel.basic_qos(prefetch_count=prefetch_count)
             
             print("Waiting for video processing messages...")
-            channel.start_consuming()
+            while not stop_event.is_set():
+                for method, properties, body in channel.consume(VIDEO_QUEUES['interactive'], inactivity_timeout=1):
+                    if method is not None:
+                        _handle_delivery(app, connection, channel, method, properties, body, VIDEO_QUEUES['interactive'])
+                    else:
+                        # Interactive queue idle: try one batch job
+                        method, properties, body = channel.basic_get(VIDEO_QUEUES['batch'])
+                        if method is not None:
+                            # Return prefetched interactive messages before the
+                            # long batch job, so other workers can take them
+                            channel.cancel()
+                            _handle_delivery(app, connection, channel, method, properties, body, VIDEO_QUEUES['batch'])
+                            break
+                    if stop_event.is_set():
+                        break
+            
+            # Hand prefetched, unstarted messages back to the broker
+            channel.cancel()
+            connection.close()
             
         except KeyboardInterrupt:
             print("Stopping consumer...")
             break
         except Exception as e:
             print(f"Consumer error: {e}")
-            import time
-            time.sleep(5)
-
+            stop_event.wait(5)
+    
+    print("Video processing consumer stopped")
@@ -0,0 +1,154 @@
+import os
+from datetime import datetime
+import pika
+
+ATTEMPTS_HEADER = 'x-attempts'
+LAST_ERROR_HEADER = 'x-last-error'
+ORIGINAL_QUEUE_HEADER = 'x-original-queue'
+DEAD_LETTERED_AT_HEADER = 'x-dead-lettered-at'
+
+class PoisonMessageError(Exception):
+    """A message that can never be processed; dead-lettered without retries."""
+
+def get_max_attempts() -> int:
+    """Deliveries of a failing message before it is dead-lettered."""
+    try:
+        return max(1, int(os.getenv('MESSAGE_MAX_ATTEMPTS', '5')))
+    except ValueError:
+        return 5
+
+def get_retry_delays() -> list:
+    """Seconds before each retry: base, doubling, capped at the maximum."""
+    try:
+        base = max(1, int(os.getenv('MESSAGE_RETRY_BASE_DELAY', '5')))
+    except ValueError:
+        base = 5
+    try:
+        cap = max(base, int(os.getenv('MESSAGE_RETRY_MAX_DELAY', '300')))
+    except ValueError:
+        cap = max(base, 300)
+    return [min(base * 2 ** retry, cap) for retry in range(get_max_attempts() - 1)]
+
+def retry_queue_name(queue_name: str, delay: int) -> str:
+    # The delay is part of the name: a queue's TTL cannot change once declared
+    return f"{queue_name}.retry.{delay}s"
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dead"
+
+def declare_retry_queues(channel, queue_name: str):
+    """Declare the delay queues and the dead-letter queue of a work queue.
+
+    A delay queue has no consumer: messages wait out its TTL, then expire
+    back into the work queue through the default exchange.
+    """
+    for delay in sorted(set(get_retry_delays())):
+        channel.queue_declare(
+            queue=retry_queue_name(queue_name, delay),
+            durable=True,
+            arguments={
+                'x-message-ttl': delay * 1000,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': queue_name
+            }
+        )
+    channel.queue_declare(queue=dead_letter_queue_name(queue_name), durable=True)
+
+def message_attempts(properties) -> int:
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return int(headers.get(ATTEMPTS_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+def _republish(channel, routing_key: str, properties, body, headers: dict):
+    channel.basic_publish(
+        exchange='',
+        routing_key=routing_key,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2,
+            content_type=getattr(properties, 'content_type', None),
+            headers=headers
+        )
+    )
+
+def retry_or_dead_letter(channel, queue_name: str, properties, body, error: Exception) -> str:
+    """Send a failed message to its next delay queue, or to the dead-letter
+    queue once it used all its attempts. Returns the queue it went to."""
+    attempts = message_attempts(properties) + 1
+    headers = dict(getattr(properties, 'headers', None) or {})
+    headers[ATTEMPTS_HEADER] = attempts
+    headers[LAST_ERROR_HEADER] = str(error)[:500]
+    headers[ORIGINAL_QUEUE_HEADER] = queue_name
+
+    delays = get_retry_delays()
+    if isinstance(error, PoisonMessageError) or attempts > len(delays):
+        headers[DEAD_LETTERED_AT_HEADER] = datetime.utcnow().isoformat()
+        target = dead_letter_queue_name(queue_name)
+    else:
+        target = retry_queue_name(queue_name, delays[attempts - 1])
+    _republish(channel, target, properties, body, headers)
+    return target
+
+def settle_failed_delivery(channel, method, properties, body, queue_name: str, error: Exception):
+    """Ack a failed message after moving it to a delay or dead-letter queue.
+
+    Falls back to a plain requeue if the move itself fails, so the message
+    is never lost. Returns the queue the message went to, or None when it
+    was requeued.
+    """
+    try:
+        target = retry_or_dead_letter(channel, queue_name, properties, body, error)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        print(f"Message from {queue_name} failed ({error}); moved to {target}")
+        return target
+    except Exception as e:
+        print(f"Could not move failed message from {queue_name}: {e}; requeueing")
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return None
+
+def _describe(properties, body) -> dict:
+    headers = dict(getattr(properties, 'headers', None) or {})
+    try:
+        payload = body.decode()
+    except UnicodeDecodeError:
+        payload = repr(body)
+    return {
+        'attempts': message_attempts(properties),
+        'last_error': headers.get(LAST_ERROR_HEADER),
+        'dead_lettered_at': headers.get(DEAD_LETTERED_AT_HEADER),
+        'body': payload
+    }
+
+def peek_dead_letters(channel, queue_name: str, limit: int) -> list:
+    """Read up to limit dead-lettered messages without removing them.
+
+    Messages are fetched unacknowledged; closing the channel afterwards
+    returns them all to the queue in their original order.
+    """
+    messages = []
+    for _ in range(limit):
+        method, properties, body = channel.basic_get(dead_letter_queue_name(queue_name), auto_ack=False)
+        if method is None:
+            break
+        messages.append(_describe(properties, body))
+    return messages
+
+def replay_dead_letters(channel, queue_name: str, limit: int) -> int:
+    """Move up to limit dead-lettered messages back to their work queue
+    with a fresh attempt count. The channel should be in confirm mode."""
+    replayed = 0
+    while replayed < limit:
+        method, properties, body = channel.basic_get(dead_letter_queue_name(queue_name), auto_ack=False)
+        if method is None:
+            break
+        headers = {
+            key: value for key, value in (properties.headers or {}).items()
+            if key not in (ATTEMPTS_HEADER, DEAD_LETTERED_AT_HEADER)
+        }
+        headers['x-replayed-at'] = datetime.utcnow().isoformat()
+        _republish(channel, queue_name, properties, body, headers)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+    return replayed
@@ -0,0 +1,134 @@
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import case, func, text
+from src.models.video_job import db, VideoJob, JobStatus
+from src.services.job_lease import reap_expired_leases, requeue_stale_dispatches
+from src.services.queue_service import VIDEO_QUEUES, publish_video_jobs
+
+PRIORITY_CLASSES = tuple(VIDEO_QUEUES)
+DEFAULT_PRIORITY_CLASS = 'interactive'
+
+# Only one dispatcher may run at a time, across every process
+DISPATCH_LOCK_KEY = 0x76696465
+
+def get_max_inflight_per_user() -> int:
+    """Dispatched but unfinished jobs a single user may have at once."""
+    try:
+        return max(1, int(os.getenv('FAIR_SHARE_MAX_INFLIGHT_PER_USER', '2')))
+    except ValueError:
+        return 2
+
+def get_dispatch_interval() -> float:
+    """Seconds between background dispatch passes."""
+    try:
+        return max(1.0, float(os.getenv('FAIR_SHARE_DISPATCH_INTERVAL', '5')))
+    except ValueError:
+        return 5.0
+
+def parse_priority_class(values) -> str:
+    """Priority class from request values; raises ValueError when unknown."""
+    priority_class = (values.get('priority') or DEFAULT_PRIORITY_CLASS).lower()
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"priority must be one of: {', '.join(PRIORITY_CLASSES)}")
+    return priority_class
+
+def dispatch_pending_jobs() -> int:
+    """Publish waiting jobs, round-robin across users, up to each user's cap.
+
+    Jobs wait in the database (PENDING, not dispatched) rather than in
+    RabbitMQ, so a user with hundreds of uploads never has more than
+    FAIR_SHARE_MAX_INFLIGHT_PER_USER jobs ahead of anyone else. Interactive
+    jobs are dispatched before batch ones; within a class each user gets one
+    job per round, users with fewer jobs in flight first. Returns the number
+    of jobs dispatched.
+    """
+    try:
+        locked = db.session.execute(
+            text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': DISPATCH_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            # Another process is dispatching right now
+            db.session.rollback()
+            return 0
+
+        cap = get_max_inflight_per_user()
+        active = (JobStatus.PENDING, JobStatus.PROCESSING)
+        inflight = dict(
+            db.session.query(VideoJob.user_id, func.count(VideoJob.id))
+            .filter(VideoJob.dispatched_at.isnot(None), VideoJob.status.in_(active))
+            .group_by(VideoJob.user_id)
+            .all()
+        )
+
+        class_rank = case((VideoJob.priority_class == 'batch', 1), else_=0)
+        ranked = db.session.query(
+            VideoJob.id,
+            VideoJob.user_id,
+            class_rank.label('class_rank'),
+            func.row_number().over(
+                partition_by=VideoJob.user_id,
+                order_by=(class_rank, VideoJob.created_at, VideoJob.id)
+            ).label('user_rank')
+        ).filter(
+            VideoJob.status == JobStatus.PENDING,
+            VideoJob.dispatched_at.is_(None)
+        ).subquery()
+        candidates = db.session.query(ranked).filter(ranked.c.user_rank <= cap).all()
+
+        # A job's slot is its position among the user's in-flight jobs
+        selected = []
+        for job_id, user_id, job_class_rank, user_rank in candidates:
+            slot = inflight.get(user_id, 0) + user_rank
+            if slot <= cap:
+                selected.append((job_class_rank, slot, user_id, job_id))
+        if not selected:
+            db.session.rollback()
+            return 0
+        selected.sort()
+
+        jobs = {
+            job.id: job
+            for job in VideoJob.query.filter(VideoJob.id.in_([row[3] for row in selected]))
+                                     .with_for_update().all()
+        }
+        now = datetime.utcnow()
+        dispatched = []
+        for _, slot, _, job_id in selected:
+            job = jobs.get(job_id)
+            if not job or job.status != JobStatus.PENDING or job.dispatched_at is not None:
+                continue
+            job.queue_name = VIDEO_QUEUES.get(job.priority_class, VIDEO_QUEUES[DEFAULT_PRIORITY_CLASS])
+            job.dispatched_at = now
+            job.scheduling_note = f"Dispatched to {job.queue_name} ({slot}/{cap} in flight for user)"
+            dispatched.append((job.id, job.queue_name, job.trace_parent))
+
+        # Publish inside the transaction: if the broker refuses the batch,
+        # nothing is marked as dispatched and the next pass retries.
+        if not dispatched or not publish_video_jobs(dispatched):
+            db.session.rollback()
+            return 0
+        db.session.commit()
+        return len(dispatched)
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error dispatching jobs: {e}")
+        return 0
+
+def start_dispatcher(app, stop_event: threading.Event = None):
+    """Run dispatch passes periodically, catching jobs whose slot freed up.
+
+    Each pass first requeues jobs whose worker lease expired, and dispatched
+    jobs whose message was never consumed, so they are dispatched again in
+    the same pass.
+    """
+    stop_event = stop_event or threading.Event()
+    print("Starting fair-share dispatcher...")
+    while not stop_event.wait(get_dispatch_interval()):
+        with app.app_context():
+            reap_expired_leases()
+            requeue_stale_dispatches()
+            count = dispatch_pending_jobs()
+        if count:
+            print(f"Dispatcher: {count} jobs dispatched")
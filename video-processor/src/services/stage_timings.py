@@ -0,0 +1,124 @@
+import os
+import time
+from contextlib import contextmanager
+
+# Summarised stage keys, in processing order
+STAGES = (
+    'queue_wait', 'probe', 'extract', 'extract_archive', 'dedup', 'archive',
+    'register_output', 'cleanup', 'notify', 'total'
+)
+PERCENTILES = (50, 90, 95, 99)
+GROUP_BY_OPTIONS = ('codec', 'resolution', 'pipeline')
+MAX_SUMMARY_JOBS = 5000
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its reaped children (ffmpeg)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class StageTimings:
+    """Wall and CPU time of each stage of one job, plus the bytes it read
+    and wrote; stored on VideoJob.stage_timings.
+
+    CPU time is process-wide: it includes ffmpeg once it exits, and also
+    anything else the process did meanwhile (one job per consumer process,
+    so that is little).
+    """
+
+    def __init__(self, pipeline: str = None):
+        self.pipeline = pipeline
+        self.stages = {}
+        self.bytes_in = None
+        self.bytes_out = None
+        self._started = time.monotonic()
+        self._cpu_started = _cpu_seconds()
+
+    def add(self, stage: str, wall_seconds: float, cpu_seconds: float = None):
+        entry = self.stages.setdefault(stage, {'wall_seconds': 0.0})
+        entry['wall_seconds'] = round(entry['wall_seconds'] + wall_seconds, 3)
+        if cpu_seconds is not None:
+            entry['cpu_seconds'] = round(entry.get('cpu_seconds', 0.0) + cpu_seconds, 3)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time a stage, also when it raises (failed jobs keep partial timings)."""
+        started, cpu_started = time.monotonic(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic() - started, _cpu_seconds() - cpu_started)
+
+    def to_dict(self) -> dict:
+        stages = dict(self.stages)
+        # From the job taken to now; queue_wait comes before it
+        stages['total'] = {
+            'wall_seconds': round(time.monotonic() - self._started, 3),
+            'cpu_seconds': round(_cpu_seconds() - self._cpu_started, 3)
+        }
+        return {
+            'pipeline': self.pipeline,
+            'stages': stages,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out
+        }
+
+def file_size(path: str):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Linear interpolation between closest ranks, as numpy's default."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+def _distribution(values: list) -> dict:
+    values = sorted(values)
+    summary = {'count': len(values)}
+    for pct in PERCENTILES:
+        summary[f'p{pct}'] = round(percentile(values, pct), 3)
+    summary['max'] = round(values[-1], 3)
+    return summary
+
+def _group_key(job, group_by: str):
+    if group_by == 'codec':
+        return job.video_codec or 'unknown'
+    if group_by == 'resolution':
+        return f"{job.width}x{job.height}" if job.width and job.height else 'unknown'
+    if group_by == 'pipeline':
+        return (job.stage_timings or {}).get('pipeline') or 'unknown'
+    return 'all'
+
+def summarize_stage_timings(jobs, group_by: str = None) -> dict:
+    """Percentiles of every stage's wall/CPU time and of bytes in/out,
+    per group of jobs."""
+    samples = {}
+    for job in jobs:
+        timings = job.stage_timings or {}
+        group = samples.setdefault(_group_key(job, group_by), {})
+        for stage, entry in (timings.get('stages') or {}).items():
+            for measure in ('wall_seconds', 'cpu_seconds'):
+                if entry.get(measure) is not None:
+                    group.setdefault(stage, {}).setdefault(measure, []).append(entry[measure])
+        for measure in ('bytes_in', 'bytes_out'):
+            if timings.get(measure) is not None:
+                group.setdefault(measure, []).append(timings[measure])
+
+    summary = {}
+    for key, group in samples.items():
+        stages = {
+            stage: {measure: _distribution(values) for measure, values in group[stage].items()}
+            for stage in STAGES if stage in group
+        }
+        summary[key] = {
+            'jobs': stages.get('total', {}).get('wall_seconds', {}).get('count', 0),
+            'stages': stages,
+            'bytes_in': _distribution(group['bytes_in']) if group.get('bytes_in') else None,
+            'bytes_out': _distribution(group['bytes_out']) if group.get('bytes_out') else None
+        }
+    return summary
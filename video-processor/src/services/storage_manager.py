@@ -0,0 +1,288 @@
+import errno
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, text
+from src.models.video_job import db, VideoJob, JobStatus
+from src.models.video_output import VideoOutput
+from src.models.upload_session import UploadSession
+from src.services.output_store import evict_output, expire_job_output, remove_file
+from src.services.upload_service import forget_upload
+
+UPLOAD_DIR = '/app/storage/uploads'
+OUTPUT_DIR = '/app/storage/outputs'
+TEMP_DIR = '/app/storage/temp'
+
+# Only one process sweeps or evicts at a time (distinct from the dispatch lock)
+STORAGE_LOCK_KEY = 0x73746f72
+
+EXPIRY_BATCH_SIZE = 100
+
+class StorageFullError(Exception):
+    """The shared volume ran out of space; the job should be retried later."""
+
+def get_retention_days() -> float:
+    """Days a completed job's archive is kept; 0 keeps archives forever."""
+    try:
+        return max(0.0, float(os.getenv('OUTPUT_RETENTION_DAYS', '30')))
+    except ValueError:
+        return 30.0
+
+def get_watermarks() -> tuple:
+    """(high, low) disk usage fractions: eviction starts above high and stops at low."""
+    try:
+        high = min(1.0, max(0.0, float(os.getenv('STORAGE_HIGH_WATERMARK', '0.90'))))
+    except ValueError:
+        high = 0.90
+    try:
+        low = min(high, max(0.0, float(os.getenv('STORAGE_LOW_WATERMARK', '0.80'))))
+    except ValueError:
+        low = min(high, 0.80)
+    return high, low
+
+def get_orphan_min_age() -> float:
+    """Seconds a file must sit untouched before an orphan sweep removes it."""
+    try:
+        return max(60.0, float(os.getenv('ORPHAN_MIN_AGE_SECONDS', '86400')))
+    except ValueError:
+        return 86400.0
+
+def get_upload_session_ttl() -> float:
+    """Hours an unfinished chunked upload may stay idle before it is aborted."""
+    try:
+        return max(1.0, float(os.getenv('UPLOAD_SESSION_TTL_HOURS', '72')))
+    except ValueError:
+        return 72.0
+
+def get_sweep_interval() -> float:
+    """Seconds between background maintenance passes."""
+    try:
+        return max(10.0, float(os.getenv('STORAGE_SWEEP_INTERVAL', '300')))
+    except ValueError:
+        return 300.0
+
+def get_storage_retry_delay() -> float:
+    """Seconds a worker waits before requeueing a job that hit a full disk."""
+    try:
+        return max(0.0, float(os.getenv('STORAGE_RETRY_DELAY', '30')))
+    except ValueError:
+        return 30.0
+
+def retention_expiry(completed_at: datetime = None):
+    """When an archive completed at completed_at expires, or None to keep it."""
+    days = get_retention_days()
+    if not days:
+        return None
+    return (completed_at or datetime.utcnow()) + timedelta(days=days)
+
+def is_disk_full_error(error: BaseException) -> bool:
+    """True for ENOSPC/EDQUOT errors, including ffmpeg's own message."""
+    while error is not None:
+        if isinstance(error, OSError) and error.errno in (errno.ENOSPC, errno.EDQUOT):
+            return True
+        if 'No space left on device' in str(error) or 'Disk quota exceeded' in str(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def disk_usage_fraction(path: str = OUTPUT_DIR) -> float:
+    usage = shutil.disk_usage(path)
+    return (usage.total - usage.free) / usage.total if usage.total else 0.0
+
+@contextmanager
+def _storage_lock():
+    """Session-level advisory lock held on its own connection across commits.
+
+    Yields False when another process holds it.
+    """
+    with db.engine.connect() as connection:
+        locked = connection.execute(
+            text('SELECT pg_try_advisory_lock(:key)'), {'key': STORAGE_LOCK_KEY}
+        ).scalar()
+        try:
+            yield bool(locked)
+        finally:
+            if locked:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': STORAGE_LOCK_KEY})
+
+def expire_jobs() -> int:
+    """Drop archives of completed jobs past their retention TTL.
+
+    Jobs are kept and marked as evicted; archives shared with jobs that
+    have not expired yet stay on disk. Returns the number of jobs expired.
+    """
+    now = datetime.utcnow()
+    expired = 0
+    while True:
+        condition = VideoJob.expires_at < now
+        days = get_retention_days()
+        if days:
+            # Jobs completed before expires_at existed fall back to completed_at
+            condition = or_(condition, and_(
+                VideoJob.expires_at.is_(None),
+                VideoJob.completed_at < now - timedelta(days=days)
+            ))
+        jobs = VideoJob.query.filter(
+            VideoJob.status == JobStatus.COMPLETED,
+            VideoJob.evicted_at.is_(None),
+            VideoJob.zip_file_path.isnot(None),
+            condition
+        ).order_by(VideoJob.id).limit(EXPIRY_BATCH_SIZE).with_for_update(skip_locked=True).all()
+        if not jobs:
+            return expired
+
+        orphaned = [expire_job_output(job, 'expired') for job in jobs]
+        db.session.commit()
+        for zip_path in orphaned:
+            if zip_path:
+                remove_file(zip_path)
+        expired += len(jobs)
+
+def _evict_until(target: float) -> int:
+    """Evict least recently accessed archives until usage is at or below target."""
+    evicted = 0
+    # One archive per transaction, so we stop as soon as enough space is free
+    while disk_usage_fraction() > target:
+        output = VideoOutput.query.order_by(
+            VideoOutput.last_accessed_at, VideoOutput.id
+        ).limit(1).with_for_update(skip_locked=True).first()
+        if not output:
+            db.session.rollback()
+            print("Storage: above watermark but no archives left to evict")
+            break
+
+        zip_path = evict_output(output, 'disk_pressure')
+        db.session.commit()
+        remove_file(zip_path)
+        evicted += 1
+    return evicted
+
+def ensure_free_space(force: bool = False) -> int:
+    """Evict archives (LRU by download) when disk use passes the high watermark.
+
+    Cheap when there is room: one statvfs and no database access. With
+    force, evicts down to the low watermark even below the high one, as
+    after a write failed with ENOSPC. Returns the number of archives evicted.
+    """
+    high, low = get_watermarks()
+    if not force and disk_usage_fraction() < high:
+        return 0
+    try:
+        with _storage_lock() as locked:
+            if not locked:
+                # Another process is already freeing space
+                return 0
+            evicted = _evict_until(low)
+        if evicted:
+            print(f"Storage: evicted {evicted} archives, disk at {disk_usage_fraction():.0%}")
+        return evicted
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error freeing storage: {e}")
+        return 0
+
+def _stale_entries(folder: str, min_age: float):
+    """Entries of folder whose mtime is older than min_age seconds."""
+    if not os.path.isdir(folder):
+        return
+    cutoff = time.time() - min_age
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    yield entry
+            except FileNotFoundError:
+                continue
+
+def _remove_entry(entry) -> bool:
+    try:
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def abort_stale_upload_sessions() -> int:
+    """Abort chunked uploads idle for longer than UPLOAD_SESSION_TTL_HOURS."""
+    cutoff = datetime.utcnow() - timedelta(hours=get_upload_session_ttl())
+    sessions = UploadSession.query.filter(
+        UploadSession.status == 'uploading',
+        UploadSession.updated_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+    for session in sessions:
+        session.status = 'aborted'
+    db.session.commit()
+
+    for session in sessions:
+        forget_upload(session.id)
+        remove_file(session.file_path)
+    return len(sessions)
+
+def sweep_orphans() -> dict:
+    """Remove temp, upload and output files nothing refers to anymore.
+
+    Only files older than ORPHAN_MIN_AGE_SECONDS are considered, so work in
+    progress (a running extraction, an upload being written) is never swept.
+    Uploads of failed jobs are kept for the retention period so they can be
+    retried.
+    """
+    min_age = get_orphan_min_age()
+    removed = {'temp': 0, 'uploads': 0, 'outputs': 0, 'upload_sessions': abort_stale_upload_sessions()}
+
+    for entry in _stale_entries(TEMP_DIR, min_age):
+        removed['temp'] += _remove_entry(entry)
+
+    keep_failed_since = datetime.utcnow() - timedelta(days=get_retention_days() or 36500)
+    live_uploads = {
+        path for (path,) in db.session.query(VideoJob.file_path).filter(or_(
+            VideoJob.status.in_((JobStatus.PENDING, JobStatus.PROCESSING)),
+            and_(VideoJob.status == JobStatus.FAILED, VideoJob.updated_at >= keep_failed_since)
+        ))
+    }
+    live_uploads.update(
+        path for (path,) in db.session.query(UploadSession.file_path).filter(UploadSession.status == 'uploading')
+    )
+    for entry in _stale_entries(UPLOAD_DIR, min_age):
+        if entry.path not in live_uploads:
+            removed['uploads'] += _remove_entry(entry)
+
+    live_outputs = {path for (path,) in db.session.query(VideoOutput.zip_file_path)}
+    live_outputs.update(
+        path for (path,) in db.session.query(VideoJob.zip_file_path).filter(VideoJob.zip_file_path.isnot(None))
+    )
+    db.session.rollback()
+    for entry in _stale_entries(OUTPUT_DIR, min_age):
+        if entry.path not in live_outputs:
+            removed['outputs'] += _remove_entry(entry)
+    return removed
+
+def run_storage_maintenance() -> dict:
+    """One maintenance pass: TTL expiry, watermark eviction and orphan sweep."""
+    try:
+        with _storage_lock() as locked:
+            if not locked:
+                return {}
+            summary = {'expired': expire_jobs()}
+            high, low = get_watermarks()
+            summary['evicted'] = _evict_until(low) if disk_usage_fraction() >= high else 0
+            summary.update(sweep_orphans())
+            return summary
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error during storage maintenance: {e}")
+        return {}
+
+def start_storage_manager(app, stop_event: threading.Event = None):
+    """Run storage maintenance passes periodically."""
+    stop_event = stop_event or threading.Event()
+    print("Starting storage manager...")
+    while not stop_event.wait(get_sweep_interval()):
+        with app.app_context():
+            summary = run_storage_maintenance()
+        if any(summary.values()):
+            print(f"Storage manager: {summary}")
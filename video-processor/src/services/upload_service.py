@@ -0,0 +1,91 @@
+import hashlib
+import os
+import threading
+from src.services.output_store import HASH_CHUNK_SIZE
+
+# Running SHA-256 state per upload session, kept by the process that
+# received the previous chunk. hashlib objects cannot be persisted, so a
+# session resumed on another process rebuilds its state from the file once.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+def get_max_chunk_bytes() -> int:
+    """Largest chunk accepted in one PUT."""
+    try:
+        return int(os.getenv('UPLOAD_MAX_CHUNK_BYTES', str(64 * 1024 * 1024)))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+def get_recommended_chunk_bytes() -> int:
+    return min(8 * 1024 * 1024, get_max_chunk_bytes())
+
+def parse_content_range(header: str):
+    """Parse 'bytes start-end/total' into (start, end, total)."""
+    if not header or not header.startswith('bytes '):
+        raise ValueError("Content-Range must look like 'bytes start-end/total'")
+    try:
+        byte_range, total = header[len('bytes '):].split('/')
+        start, end = byte_range.split('-')
+        return int(start), int(end), int(total)
+    except ValueError:
+        raise ValueError("Content-Range must look like 'bytes start-end/total'")
+
+def _hasher_at(upload_id: str, file_path: str, offset: int):
+    """Hash state covering exactly the first offset bytes of the upload.
+
+    A copy of the cached state: a chunk that fails halfway must not leave
+    its bytes in the state kept for the retry.
+    """
+    with _hashers_lock:
+        state = _hashers.get(upload_id)
+    if state and state[1] == offset:
+        return state[0].copy()
+
+    digest = hashlib.sha256()
+    remaining = offset
+    if remaining:
+        with open(file_path, 'rb') as existing:
+            while remaining:
+                chunk = existing.read(min(HASH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise Exception("Upload file is shorter than recorded")
+                digest.update(chunk)
+                remaining -= len(chunk)
+    return digest
+
+def append_chunk(upload_id: str, file_path: str, offset: int, stream, length: int):
+    """Append a chunk at offset, hashing it incrementally.
+
+    Returns (bytes written, hash state). Any bytes past offset left behind
+    by an interrupted earlier attempt are overwritten. Pass the state to
+    remember_hash_state once the new offset is committed.
+    """
+    digest = _hasher_at(upload_id, file_path, offset)
+
+    written = 0
+    with open(file_path, 'r+b' if os.path.exists(file_path) else 'wb') as out:
+        out.seek(offset)
+        out.truncate()
+        while written < length:
+            chunk = stream.read(min(HASH_CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            written += len(chunk)
+    return written, digest
+
+def remember_hash_state(upload_id: str, digest, offset: int):
+    """Keep the hash state of the first offset bytes for the next chunk."""
+    with _hashers_lock:
+        _hashers[upload_id] = (digest, offset)
+
+def finalize_digest(upload_id: str, file_path: str, total_size: int) -> str:
+    """SHA-256 of a fully received upload, without re-reading it when possible."""
+    digest = _hasher_at(upload_id, file_path, total_size)
+    forget_upload(upload_id)
+    return digest.hexdigest()
+
+def forget_upload(upload_id: str):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
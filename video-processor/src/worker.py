@@ -0,0 +1,123 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import multiprocessing
+import signal
+import threading
+import time
+from src.main import app, prepare_storage
+from src.models.video_job import db
+from src.services.metrics import start_worker_metrics_server
+from src.services.queue_consumer import start_queue_consumer
+
+def get_worker_concurrency() -> int:
+    """Number of consumer processes run by this supervisor."""
+    try:
+        return max(1, int(os.getenv('WORKER_CONCURRENCY', '2')))
+    except ValueError:
+        return 2
+
+def get_worker_prefetch() -> int:
+    """Unacknowledged messages each consumer process may hold."""
+    try:
+        return max(1, int(os.getenv('WORKER_PREFETCH', '1')))
+    except ValueError:
+        return 1
+
+def get_shutdown_timeout() -> float:
+    """Seconds to wait for in-flight jobs to drain on shutdown."""
+    try:
+        return float(os.getenv('WORKER_SHUTDOWN_TIMEOUT', '600'))
+    except ValueError:
+        return 600.0
+
+def run_worker(index: int, prefetch_count: int):
+    """Entry point of one consumer process."""
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Worker {index}: stop requested, draining in-flight job...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    # Ctrl+C reaches the whole process group; the supervisor coordinates it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Never reuse database connections inherited from the supervisor
+    with app.app_context():
+        db.engine.dispose()
+
+    print(f"Worker {index} started (pid {os.getpid()}, prefetch {prefetch_count})")
+    start_queue_consumer(app, prefetch_count=prefetch_count, stop_event=stop_event)
+
+class WorkerSupervisor:
+    """Keep N consumer processes running and shut them down gracefully."""
+
+    def __init__(self, concurrency: int, prefetch_count: int, shutdown_timeout: float):
+        self.concurrency = concurrency
+        self.prefetch_count = prefetch_count
+        self.shutdown_timeout = shutdown_timeout
+        self.processes = {}
+        self.stopping = False
+
+    def _spawn(self, index: int):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(index, self.prefetch_count),
+            name=f'video-worker-{index}'
+        )
+        process.start()
+        self.processes[index] = process
+
+    def request_stop(self, signum, frame):
+        if not self.stopping:
+            print("Supervisor: shutting down workers...")
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        for index in range(self.concurrency):
+            self._spawn(index)
+
+        while not self.stopping:
+            for index, process in list(self.processes.items()):
+                if not process.is_alive():
+                    print(f"Supervisor: worker {index} exited with code {process.exitcode}, restarting")
+                    time.sleep(1)
+                    self._spawn(index)
+            time.sleep(1)
+
+        self.shutdown()
+
+    def shutdown(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for index, process in self.processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"Supervisor: worker {index} did not drain in time, killing it")
+                process.kill()
+                process.join()
+
+        print("Supervisor: all workers stopped")
+
+if __name__ == '__main__':
+    prepare_storage()
+    with app.app_context():
+        db.create_all()
+
+    # Before the consumers start: it resets the shared multiprocess metrics
+    start_worker_metrics_server()
+
+    WorkerSupervisor(
+        get_worker_concurrency(),
+        get_worker_prefetch(),
+        get_shutdown_timeout()
+    ).run()